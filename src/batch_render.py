@@ -0,0 +1,215 @@
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import cv2 as cv
+
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv", ".h264"}
+
+DETECT_KWARGS = {
+    'scale_factor': 1.1,
+    'min_neighbors': 5,
+    'min_size': (50, 50),
+}
+
+# Per-process components, created once by _init_worker
+_face_detector = None
+_head_swapper = None
+_detect_kwargs = None
+
+
+def _init_worker(sprite_path, scale_factor, detect_kwargs):
+    """Load sprites and cascade once per worker process"""
+    global _face_detector, _head_swapper, _detect_kwargs
+    # The pool provides the parallelism, keep OpenCV from oversubscribing cores
+    cv.setNumThreads(1)
+
+    # Imported here so component startup messages only appear in workers
+    from cat import load_all_cats
+    from face_detection import FaceDetector
+    from head_swap import HeadSwapper
+
+    _face_detector = FaceDetector()
+    _head_swapper = HeadSwapper(load_all_cats(sprite_path), scale_factor=scale_factor)
+    _detect_kwargs = detect_kwargs
+
+
+def _render_frame(frame):
+    """Detect faces and swap them, returns (frame, face count)"""
+    faces = _face_detector.detect_faces(frame, **_detect_kwargs)
+    frame = _head_swapper.swap_heads(frame, faces)
+    return frame, len(faces)
+
+
+def _render_video_frame(item):
+    index, frame = item
+    frame, face_count = _render_frame(frame)
+    return index, frame, face_count
+
+
+def _render_image_file(paths):
+    """Read, render and write one still; returns (source, face count or None on failure)"""
+    src, dst = paths
+    frame = cv.imread(src)
+    if frame is None:
+        return src, None
+    frame, face_count = _render_frame(frame)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    cv.imwrite(dst, frame)
+    return src, face_count
+
+
+class Progress:
+    def __init__(self, total, label, every=2.0):
+        """Print done/total, throughput and ETA at most every `every` seconds"""
+        self.total = total
+        self.label = label
+        self.every = every
+        self.done = 0
+        self.faces = 0
+        self.start = time.time()
+        self.last_print = 0.0
+
+    def update(self, faces=0):
+        self.done += 1
+        self.faces += faces
+        now = time.time()
+        if now - self.last_print >= self.every or self.done == self.total:
+            self.last_print = now
+            elapsed = now - self.start
+            rate = self.done / elapsed if elapsed > 0 else 0.0
+            total = f"/{self.total}" if self.total else ""
+            eta = ""
+            if self.total and rate > 0:
+                eta = f", ETA {(self.total - self.done) / rate:.0f}s"
+            print(f"{self.label}: {self.done}{total} ({rate:.1f}/s{eta})", file=sys.stderr)
+
+    def summary(self):
+        elapsed = time.time() - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        return {'items': self.done, 'faces': self.faces, 'seconds': elapsed, 'per_second': rate}
+
+
+def _read_frames(cap):
+    index = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield index, frame
+        index += 1
+
+
+def render_video(pool, src, dst, chunksize=4):
+    """
+    Render a video file through the pool and write an mp4 in frame order
+    """
+    cap = cv.VideoCapture(src)
+    if not cap.isOpened():
+        print(f"ERROR: Cannot open video {src}")
+        return None
+
+    fps = cap.get(cv.CAP_PROP_FPS) or 30.0
+    width = int(cap.get(cv.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv.CAP_PROP_FRAME_HEIGHT))
+    total = int(cap.get(cv.CAP_PROP_FRAME_COUNT)) or None
+
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    writer = cv.VideoWriter(dst, cv.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        cap.release()
+        print(f"ERROR: Cannot open video writer for {dst}")
+        return None
+
+    print(f"Rendering {src} -> {dst} ({width}x{height} @ {fps:.1f} fps)")
+    progress = Progress(total, os.path.basename(src))
+    try:
+        # imap keeps results in submission order
+        for index, frame, face_count in pool.imap(_render_video_frame, _read_frames(cap),
+                                                  chunksize=chunksize):
+            writer.write(frame)
+            progress.update(face_count)
+    finally:
+        cap.release()
+        writer.release()
+
+    return progress.summary()
+
+
+def render_directory(pool, src_dir, dst_dir, chunksize=2):
+    """
+    Render every still and video under src_dir into the same layout under dst_dir
+    """
+    images = []
+    videos = []
+    for folder, _, files in os.walk(src_dir):
+        for name in sorted(files):
+            ext = os.path.splitext(name)[1].lower()
+            src = os.path.join(folder, name)
+            dst = os.path.join(dst_dir, os.path.relpath(src, src_dir))
+            if ext in IMAGE_EXTENSIONS:
+                images.append((src, dst))
+            elif ext in VIDEO_EXTENSIONS:
+                videos.append((src, os.path.splitext(dst)[0] + ".mp4"))
+    images.sort()
+
+    summaries = {}
+    if images:
+        print(f"Rendering {len(images)} images from {src_dir} -> {dst_dir}")
+        progress = Progress(len(images), "images")
+        failed = 0
+        for src, face_count in pool.imap(_render_image_file, images, chunksize=chunksize):
+            if face_count is None:
+                print(f"Could not read {src}", file=sys.stderr)
+                failed += 1
+                face_count = 0
+            progress.update(face_count)
+        summaries['images'] = progress.summary()
+        summaries['images']['failed'] = failed
+
+    for src, dst in videos:
+        summaries[src] = render_video(pool, src, dst)
+
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless batch head swap for videos and image folders")
+    parser.add_argument("input", help="video file or directory of stills/videos")
+    parser.add_argument("output", help="output video file or directory")
+    parser.add_argument("--workers", "-j", type=int, default=os.cpu_count(),
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--sprites", default="cat.png", help="cat sprite sheet")
+    parser.add_argument("--scale", type=float, default=1.3, help="cat size relative to face")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"ERROR: {args.input} does not exist")
+        return 1
+
+    start = time.time()
+    with mp.Pool(args.workers, initializer=_init_worker,
+                 initargs=(args.sprites, args.scale, DETECT_KWARGS)) as pool:
+        if os.path.isdir(args.input):
+            summaries = render_directory(pool, args.input, args.output)
+        else:
+            summaries = {args.input: render_video(pool, args.input, args.output)}
+
+    print("\n" + "-"*60)
+    print(f"Done in {time.time() - start:.1f}s with {args.workers} workers")
+    for name, summary in summaries.items():
+        if summary is None:
+            print(f"  {name}: failed")
+        else:
+            print(f"  {name}: {summary['items']} items, {summary['faces']} faces, "
+                  f"{summary['per_second']:.1f}/s")
+    print("-"*60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import cv2 as cv
+import numpy as np
+import time
+from cat import load_all_cats, cat_paste_legacy, prepare_cat, cat_blend
+
+
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+}
+SPRITE_SIZE = 260
+ITERATIONS = 200
+
+
+def time_it(fn, iterations=ITERATIONS):
+    """Run fn repeatedly and return mean milliseconds per call"""
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000.0 / iterations
+
+
+def main():
+    cat = load_all_cats("cat.png")[0]
+    cat = cv.resize(cat, (SPRITE_SIZE, SPRITE_SIZE), interpolation=cv.INTER_AREA)
+    prepared = prepare_cat(cat)
+
+    print(f"Sprite {SPRITE_SIZE}x{SPRITE_SIZE}, {ITERATIONS} iterations")
+    print(f"{'resolution':<12}{'legacy ms':>12}{'blend ms':>12}{'speedup':>10}{'max diff':>10}")
+
+    for name, (width, height) in RESOLUTIONS.items():
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        x = width // 2 - SPRITE_SIZE // 2
+        y = height // 2 - SPRITE_SIZE // 2
+
+        # Both versions repeatedly blend onto the same frame
+        legacy_frame = frame.copy()
+        blend_frame = frame.copy()
+        legacy_ms = time_it(lambda: cat_paste_legacy(legacy_frame, cat, x, y))
+        blend_ms = time_it(lambda: cat_blend(blend_frame, prepared, x, y))
+
+        # Accuracy of a single paste against the float reference
+        expected = cat_paste_legacy(frame.copy(), cat, x, y)
+        actual = cat_blend(frame.copy(), prepared, x, y)
+        max_diff = int(np.abs(expected.astype(np.int16) - actual.astype(np.int16)).max())
+
+        print(f"{name:<12}{legacy_ms:>12.3f}{blend_ms:>12.3f}"
+              f"{legacy_ms / blend_ms:>9.1f}x{max_diff:>10}")
+
+
+if __name__ == "__main__":
+    main()
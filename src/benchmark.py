@@ -0,0 +1,297 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2 as cv
+import numpy as np
+
+from cat import load_all_cats, cat_paste
+from face_detection import FaceDetector
+from head_swap import HeadSwapper
+from shot_archive import ShotArchive
+
+# fp2_headswap is a GUI app, only its clothing color helpers are timed
+try:
+    import fp2_headswap
+except Exception as e:
+    fp2_headswap = None
+    FP2_IMPORT_ERROR = str(e)
+else:
+    FP2_IMPORT_ERROR = None
+
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+# ========================================
+# FRAME SOURCES
+# ========================================
+def frames_from_npz(path, limit=None):
+    """Frames saved by CameraController.save_shots_to_file (RGB)"""
+    data = np.load(path)
+    for i, image in enumerate(data['images']):
+        if limit is not None and i >= limit:
+            break
+        yield cv.cvtColor(image, cv.COLOR_RGB2BGR)
+
+
+def frames_from_archive(path, limit=None):
+    """Frames from a shot archive written by CameraController.open_archive (RGB)"""
+    archive = ShotArchive(path)
+    count = len(archive) if limit is None else min(limit, len(archive))
+    for i in range(count):
+        yield cv.cvtColor(archive[i], cv.COLOR_RGB2BGR)
+
+
+def frames_from_video(path, limit=None):
+    """Frames from any video file OpenCV can read"""
+    cap = cv.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video {path}")
+    count = 0
+    try:
+        while limit is None or count < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            count += 1
+            yield frame
+    finally:
+        cap.release()
+
+
+def synthetic_frames(face_image_path, count=100, size=(1280, 720), faces_per_frame=3, seed=0):
+    """
+    Noise frames with face crops pasted at random places
+
+    Face crops come from running the detector once on face_image_path,
+    so every synthetic frame has faces the cascade can find.
+    """
+    rng = np.random.default_rng(seed)
+    source = cv.imread(face_image_path)
+    if source is None:
+        raise ValueError(f"Could not load face image {face_image_path}")
+
+    found = FaceDetector().detect_faces(source, min_size=(30, 30))
+    if len(found) == 0:
+        raise ValueError(f"No faces found in {face_image_path}")
+
+    # Give every crop some margin so the cascade sees a whole head
+    crops = []
+    for (x, y, w, h) in found:
+        m = w // 3
+        crops.append(source[max(0, y - m):y + h + m, max(0, x - m):x + w + m])
+
+    width, height = size
+    background = cv.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (9, 9), 0)
+    for _ in range(count):
+        frame = background.copy()
+        for _ in range(faces_per_frame):
+            crop = crops[rng.integers(len(crops))]
+            side = int(rng.integers(height // 6, height // 3))
+            crop = cv.resize(crop, (side, side), interpolation=cv.INTER_AREA)
+            x = int(rng.integers(0, width - side))
+            y = int(rng.integers(0, height - side))
+            frame[y:y+side, x:x+side] = crop
+        yield frame
+
+
+# ========================================
+# TIMING
+# ========================================
+class Timings:
+    def __init__(self):
+        """Millisecond samples per stage name"""
+        self.samples = {}
+
+    def add(self, stage, seconds):
+        """Record one sample in seconds (stored as milliseconds)"""
+        self.samples.setdefault(stage, []).append(seconds * 1000.0)
+
+    def timed(self, stage, fn, *args, **kwargs):
+        """Call fn and record how long it took"""
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.add(stage, time.perf_counter() - start)
+        return result
+
+    def summary(self):
+        """Per stage count, mean, min, max and percentiles in milliseconds"""
+        report = {}
+        for stage, values in self.samples.items():
+            values = np.array(values)
+            report[stage] = {
+                'count': int(values.size),
+                'mean_ms': float(values.mean()),
+                'min_ms': float(values.min()),
+                'max_ms': float(values.max()),
+            }
+            for p in PERCENTILES:
+                report[stage][f'p{p}_ms'] = float(np.percentile(values, p))
+        return report
+
+
+def git_commit():
+    """Short hash of the checked out commit, if run inside the repo"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def pi_model():
+    """Raspberry Pi model string, None on other machines"""
+    try:
+        with open('/proc/device-tree/model') as f:
+            return f.read().strip('\x00\n')
+    except OSError:
+        return None
+
+
+# ========================================
+# BENCHMARK
+# ========================================
+def run_benchmark(frames, sprite_path="cat.png", detect_kwargs=None, warmup=3, load_repeats=5):
+    """
+    Time every stage of the detect-and-swap path on the given frames
+
+    Returns:
+        Timings with one sample per frame and stage
+    """
+    detect_kwargs = detect_kwargs or {'scale_factor': 1.1, 'min_neighbors': 5, 'min_size': (50, 50)}
+    timings = Timings()
+
+    # Cold loads process the sheet every time, warm loads memory-map a
+    # cache filled by one untimed load. A temp dir keeps ~/.cache untouched.
+    for _ in range(load_repeats):
+        cat_faces = timings.timed('load_cats_cold', load_all_cats, sprite_path, cache_dir=None)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        load_all_cats(sprite_path, cache_dir=cache_dir)
+        for _ in range(load_repeats):
+            timings.timed('load_cats_warm', load_all_cats, sprite_path, cache_dir=cache_dir)
+    face_detector = FaceDetector()
+    head_swapper = HeadSwapper(cat_faces, scale_factor=1.3)
+    paste_sprite = cv.resize(cat_faces[0], (200, 200), interpolation=cv.INTER_AREA)
+
+    face_counts = []
+    warm_kmeans = {}  # per face slot, only used with DOMINANT_COLOR_MODE "kmeans_warm"
+    for index, frame in enumerate(frames):
+        detect_start = time.perf_counter()
+        faces = face_detector.detect_faces(frame, **detect_kwargs)
+        detect_end = time.perf_counter()
+
+        # Swap on a copy so the other stages see the original frame
+        swap_frame = frame.copy()
+        swap_start = time.perf_counter()
+        head_swapper.swap_heads(swap_frame, faces)
+        swap_end = time.perf_counter()
+
+        # Single paste of a fixed sprite in the frame center
+        h, w = frame.shape[:2]
+        paste_frame = frame.copy()
+        paste_start = time.perf_counter()
+        cat_paste(paste_frame, paste_sprite, w // 2 - 100, h // 2 - 100)
+        paste_end = time.perf_counter()
+
+        clothing_time = None
+        if fp2_headswap is not None and len(faces) > 0:
+            clothing_start = time.perf_counter()
+            clothing = fp2_headswap.get_clothing_pixels_batch(frame, faces)
+            for slot, (region, coords, pixels) in enumerate(clothing):
+                if region.size == 0:
+                    continue
+                if pixels.size == 0:
+                    pixels = region
+                # Face order stands in for identity, like swap_heads without track IDs
+                if slot not in warm_kmeans:
+                    warm_kmeans[slot] = fp2_headswap.WarmKMeans()
+                fp2_headswap.get_dominant_color(pixels.reshape(-1, 1, 3), warm_kmeans=warm_kmeans[slot])
+            clothing_time = time.perf_counter() - clothing_start
+
+        if index < warmup:
+            continue
+
+        timings.add('detect_faces', detect_end - detect_start)
+        timings.add('swap_heads', swap_end - swap_start)
+        timings.add('cat_paste', paste_end - paste_start)
+        timings.add('end_to_end', (detect_end - detect_start) + (swap_end - swap_start))
+        if clothing_time is not None:
+            timings.add('fp2_clothing_color', clothing_time)
+        face_counts.append(len(faces))
+
+    timings.face_counts = face_counts
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the detect-and-swap path")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--npz", help="shot archive from CameraController.save_shots_to_file")
+    source.add_argument("--archive", help="shot archive from CameraController.open_archive")
+    source.add_argument("--video", help="video file to replay")
+    source.add_argument("--synthetic", type=int, metavar="N", default=100,
+                        help="number of synthetic frames (default)")
+    parser.add_argument("--face-image", default="hollywoof.png",
+                        help="image with faces used for synthetic frames")
+    parser.add_argument("--size", default="1280x720", help="synthetic frame size WxH")
+    parser.add_argument("--limit", type=int, default=None, help="max frames to read")
+    parser.add_argument("--sprites", default="cat.png", help="cat sprite sheet")
+    parser.add_argument("--warmup", type=int, default=3, help="frames excluded from stats")
+    parser.add_argument("--output", "-o", default=None, help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    if args.npz:
+        frames = frames_from_npz(args.npz, args.limit)
+        input_desc = {'type': 'npz', 'path': args.npz}
+    elif args.archive:
+        frames = frames_from_archive(args.archive, args.limit)
+        input_desc = {'type': 'archive', 'path': args.archive}
+    elif args.video:
+        frames = frames_from_video(args.video, args.limit)
+        input_desc = {'type': 'video', 'path': args.video}
+    else:
+        width, height = (int(v) for v in args.size.lower().split('x'))
+        frames = synthetic_frames(args.face_image, count=args.synthetic, size=(width, height))
+        input_desc = {'type': 'synthetic', 'count': args.synthetic, 'size': [width, height],
+                      'face_image': args.face_image}
+
+    # Components print progress, keep stdout for the JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        timings = run_benchmark(frames, sprite_path=args.sprites, warmup=args.warmup)
+
+    result = {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'commit': git_commit(),
+            'machine': platform.machine(),
+            'pi_model': pi_model(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'opencv': cv.__version__,
+            'numpy': np.__version__,
+            'fp2_skipped': FP2_IMPORT_ERROR,
+        },
+        'input': input_desc,
+        'frames': len(timings.face_counts),
+        'mean_faces': float(np.mean(timings.face_counts)) if timings.face_counts else 0.0,
+        'stages': timings.summary(),
+    }
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+        print(f"Benchmark written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
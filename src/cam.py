@@ -1,17 +1,150 @@
 #2025/11/15 ECPS205 Final Project... KEVIN_LEE
-from picamera2 import Picamera2, Preview
 import time as time
 import os
+import cv2 as cv
 import numpy as np
+from shot_archive import ShotArchive, ShotArchiveWriter
+
+# picamera2 only exists on the Pi, CameraController(backend=FakePicamera2) works without it
+try:
+    from picamera2 import Picamera2, Preview
+except ImportError:
+    Picamera2 = None
+    Preview = None
+
+
+class ShotRingBuffer:
+    def __init__(self, capacity=64, overwrite=True):
+        """
+        Fixed capacity ring buffer of same-shaped frames in one contiguous array
+
+        Storage is allocated on the first append. When full, overwrite=True
+        replaces the oldest frame, overwrite=False rejects new frames.
+        """
+        self.capacity = capacity
+        self.overwrite = overwrite
+        self.frames = None
+        self.start = 0     # storage slot of the oldest frame
+        self.count = 0
+        self.overwritten = 0
+        self.rejected = 0
+
+    def __len__(self):
+        return self.count
+
+    def _slot(self, index):
+        """Storage slot of logical index (0 = oldest, negative from newest)"""
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(f"Shot index {index} out of range (0-{self.count-1})")
+        return (self.start + index) % self.capacity
+
+    def __getitem__(self, index):
+        """
+        View (no copy) of one frame
+
+        The view is live: once the buffer wraps, a later append overwrites
+        it. Copy it to keep it.
+        """
+        return self.frames[self._slot(index)]
+
+    def append(self, frame):
+        """
+        Copy a frame into the next slot
+        
+        Returns:
+            True if stored, False if rejected (full and overwrite=False)
+        """
+        if self.frames is None:
+            self.frames = np.empty((self.capacity,) + frame.shape, dtype=frame.dtype)
+        elif frame.shape != self.frames.shape[1:]:
+            raise ValueError(f"Frame shape {frame.shape} does not match buffer {self.frames.shape[1:]}")
+
+        if self.count == self.capacity:
+            if not self.overwrite:
+                self.rejected += 1
+                return False
+            # Oldest slot becomes the newest
+            slot = self.start
+            self.start = (self.start + 1) % self.capacity
+            self.overwritten += 1
+        else:
+            slot = (self.start + self.count) % self.capacity
+            self.count += 1
+
+        np.copyto(self.frames[slot], frame)
+        return True
+
+    def views(self):
+        """
+        List of per-frame views, oldest first
+
+        Live views like __getitem__, later appends can change what they
+        show.
+        """
+        return [self.frames[self._slot(i)] for i in range(self.count)]
+
+    def stacked(self):
+        """
+        4D array (count, H, W, C) of all frames, oldest first
+        
+        A view while the frames are contiguous in storage. Once the buffer
+        has wrapped around they are not, then this is a copy; storage is
+        never reordered, so views from __getitem__/views() stay valid.
+        Later appends overwrite the view like any other.
+        """
+        if self.count == 0:
+            return None
+        end = self.start + self.count
+        if end > self.capacity:
+            return np.concatenate((self.frames[self.start:], self.frames[:end - self.capacity]))
+        return self.frames[self.start:end]
+
+    def clear(self):
+        """Forget all frames (storage is kept for reuse)"""
+        self.start = 0
+        self.count = 0
+
+    def memory_usage(self):
+        """Allocated and used bytes"""
+        allocated = self.frames.nbytes if self.frames is not None else 0
+        used = allocated * self.count // self.capacity if self.capacity else 0
+        return {'allocated_bytes': allocated, 'used_bytes': used,
+                'count': self.count, 'capacity': self.capacity,
+                'overwritten': self.overwritten, 'rejected': self.rejected}
+
 
 class CameraController:
-    def __init__(self, camid=0, preview=False):
-        """Init Camera"""
+    def __init__(self, camid=0, preview=False, shot_capacity=64, overwrite_shots=True,
+                 pixel_format=None, size=None, backend=None, lores_size=None,
+                 buffer_count=None):
+        """
+        Init Camera
+        
+        pixel_format="YUV420" captures planar YUV so detection can use the
+        luma plane directly (see capture_for_detection). backend is the
+        camera class, Picamera2 by default or FakePicamera2 for testing.
+        
+        lores_size=(w, h) adds a small YUV420 stream next to main: analysis
+        runs on the lores luma plane, main is only used for output. Both
+        come from the same sensor frame (see capture_pair). buffer_count
+        sets the number of frame buffers the camera cycles through.
+        """
+        if backend is None:
+            if Picamera2 is None:
+                raise ImportError("picamera2 is not installed (use backend=FakePicamera2 to run without a camera)")
+            backend = Picamera2
         self.camid = camid
-        self.picam = Picamera2(camid)
+        self.picam = backend(camid)
+        self.pixel_format = pixel_format
+        self.size = size
+        self.lores_size = lores_size
+        self.buffer_count = buffer_count
         self.preview = preview
         self.imgid = 0
-        self.shot_arrays = []
+        self.shots = ShotRingBuffer(shot_capacity, overwrite_shots)
+        self.archive_writer = None
         print("Camera Init\n")
     
     def start_preview(self):
@@ -36,6 +169,22 @@ class CameraController:
                 print(f"Preview failed: {e}")
                 print("Running in headless mode...")
             
+            # Only reconfigure when asked, otherwise keep the default preview setup
+            if (self.pixel_format is not None or self.size is not None
+                    or self.lores_size is not None or self.buffer_count is not None):
+                main = {}
+                if self.pixel_format is not None:
+                    main["format"] = self.pixel_format
+                if self.size is not None:
+                    main["size"] = self.size
+                options = {}
+                if self.lores_size is not None:
+                    # The ISP only produces lores as YUV420
+                    options["lores"] = {"size": self.lores_size, "format": "YUV420"}
+                if self.buffer_count is not None:
+                    options["buffer_count"] = self.buffer_count
+                self.picam.configure(self.picam.create_preview_configuration(main=main, **options))
+            
             self.picam.start()
             time.sleep(1)
             self.preview = True
@@ -58,6 +207,111 @@ class CameraController:
             self.start_preview()
         return self.picam.capture_array("main")
     
+    def capture_pair(self):
+        """
+        Capture main and lores of the same sensor frame in one request
+        
+        The arrays are the ones Picamera2 copied out of the frame buffer,
+        nothing is copied or converted here.
+        
+        Returns:
+            (main, lores, metadata)
+        """
+        if self.lores_size is None:
+            raise RuntimeError("No lores stream configured (pass lores_size)")
+        if not self.preview:
+            self.start_preview()
+        (main, lores), metadata = self.picam.capture_arrays(["main", "lores"])
+        return main, lores, metadata
+    
+    def is_yuv(self):
+        """True if frames are planar YUV420"""
+        return self.pixel_format == "YUV420"
+    
+    def frame_size(self, raw):
+        """(width, height) of the picture in a raw capture"""
+        if self.is_yuv():
+            if self.size is not None:
+                return self.size
+            return raw.shape[1], raw.shape[0] * 2 // 3
+        return raw.shape[1], raw.shape[0]
+    
+    def capture_for_detection(self):
+        """
+        Capture a frame and get a grayscale image for detection
+        
+        In YUV420 mode the grayscale image is a view of the luma plane,
+        no conversion and no copy. Keep the raw frame to make BGR later
+        with to_bgr, only for frames that are actually shown or saved.
+        With a lores stream the grayscale image is the lores luma plane,
+        so it is smaller than the frame; scale boxes with frame_size(raw).
+        
+        Returns:
+            (gray, raw)
+        """
+        if self.lores_size is not None:
+            raw, lores, _ = self.capture_pair()
+            width, height = self.lores_size
+            return lores[:height, :width], raw
+        raw = self.capture_frame()
+        if self.is_yuv():
+            width, height = self.frame_size(raw)
+            return raw[:height, :width], raw
+        return cv.cvtColor(raw, cv.COLOR_RGB2GRAY), raw
+    
+    def to_bgr(self, raw, roi=None):
+        """
+        Convert a raw capture to BGR, optionally only the roi=(x, y, w, h) part
+        """
+        if not self.is_yuv():
+            if roi is not None:
+                x, y, w, h = roi
+                raw = raw[y:y+h, x:x+w]
+            return cv.cvtColor(raw, cv.COLOR_RGB2BGR)
+        
+        width, height = self.frame_size(raw)
+        stride = raw.shape[1]
+        if roi is None:
+            # Rows may be padded, convert at stride width and crop
+            bgr = cv.cvtColor(raw, cv.COLOR_YUV2BGR_I420)
+            return bgr[:, :width] if stride != width else bgr
+        
+        # Snap the region to even coordinates to match the chroma planes
+        x, y, w, h = roi
+        x0 = max(0, x) & ~1
+        y0 = max(0, y) & ~1
+        x1 = min(width, x + w)
+        y1 = min(height, y + h)
+        x1 += x1 & 1
+        y1 += y1 & 1
+        
+        # Each raw row of a chroma plane holds two rows of stride/2 samples
+        quarter = height // 4
+        u = raw[height:height + quarter].reshape(height // 2, stride // 2)
+        v = raw[height + quarter:height + 2 * quarter].reshape(height // 2, stride // 2)
+        u = u[y0 // 2:y1 // 2, x0 // 2:x1 // 2]
+        v = v[y0 // 2:y1 // 2, x0 // 2:x1 // 2]
+        
+        # Small I420 image of just the region
+        roi_w, roi_h = x1 - x0, y1 - y0
+        i420 = np.empty(roi_h * roi_w * 3 // 2, dtype=raw.dtype)
+        luma = roi_h * roi_w
+        i420[:luma].reshape(roi_h, roi_w)[:] = raw[y0:y1, x0:x1]
+        i420[luma:luma + luma // 4].reshape(roi_h // 2, roi_w // 2)[:] = u
+        i420[luma + luma // 4:].reshape(roi_h // 2, roi_w // 2)[:] = v
+        return cv.cvtColor(i420.reshape(roi_h * 3 // 2, roi_w), cv.COLOR_YUV2BGR_I420)
+    
+    def shot_array(self, raw):
+        """
+        Raw capture as the RGB array kept for shots
+
+        YUV420 captures are converted, so shot buffers, npz files and
+        archives always hold (H, W, 3) RGB whatever the pixel format.
+        """
+        if self.is_yuv():
+            return cv.cvtColor(self.to_bgr(raw), cv.COLOR_BGR2RGB)
+        return raw
+    
     def take_shot(self):
         """Interactive shot capture mode"""
         self.start_preview()
@@ -65,9 +319,12 @@ class CameraController:
         take = take.lower()
         
         if take == "s":
-            # Capture as array
-            img_array = self.picam.capture_array("main")
-            self.shot_arrays.append(img_array)
+            # Capture as array, shots are always stored as RGB
+            img_array = self.shot_array(self.picam.capture_array("main"))
+            if not self.shots.append(img_array):
+                print("Shot buffer full, shot not kept in memory")
+            if self.archive_writer is not None:
+                self.archive_writer.append(img_array)
             
             # Save as jpg for viewing image purposes
             filename = f"cam0_{self.imgid}.jpg"
@@ -89,55 +346,104 @@ class CameraController:
     
     def list_shots(self):
         """List all captured shots"""
-        if len(self.shot_arrays) == 0:
+        if len(self.shots) == 0:
             print("\nNo shots captured yet.\n")
         else:
-            print(f"\nCaptured Shots ({len(self.shot_arrays)}) ")
+            print(f"\nCaptured Shots ({len(self.shots)}) ")
+            self.print_memory_usage()
+    
+    def print_memory_usage(self):
+        """Print how much memory the shot buffer uses"""
+        usage = self.shots.memory_usage()
+        print(f"Shot buffer: {usage['count']}/{usage['capacity']} shots, "
+              f"{usage['used_bytes'] / 1e6:.1f} of {usage['allocated_bytes'] / 1e6:.1f} MB used, "
+              f"{usage['overwritten']} overwritten, {usage['rejected']} rejected")
     
     def get_shot(self, index):
-        """Get a specific shot by index"""
-        if 0 <= index < len(self.shot_arrays):
-            return self.shot_arrays[index]
+        """
+        Get a specific shot by index
+
+        Returns a live view into the shot buffer, not a copy: later shots
+        overwrite it once the buffer is full. Use .copy() to keep it.
+        """
+        if 0 <= index < len(self.shots):
+            return self.shots[index]
         else:
-            print(f"Error: Shot index {index} out of range (0-{len(self.shot_arrays)-1})")
+            print(f"Error: Shot index {index} out of range (0-{len(self.shots)-1})")
             return None
     
     def get_all_shots(self):
-        """Get all captured shots as a list"""
-        return self.shot_arrays
+        """
+        Get all captured shots as a list of views
+
+        Live views like get_shot, later shots overwrite them once the
+        buffer is full.
+        """
+        return self.shots.views()
     
     def get_shots_as_array(self):
-        """Get all shots stacked as a single 4D numpy array"""
-        if len(self.shot_arrays) > 0:
-            return np.array(self.shot_arrays)
-        return None
+        """
+        Get all shots stacked as a single 4D numpy array
+
+        A view of the shot buffer until it has wrapped around, a copy
+        after that (see ShotRingBuffer.stacked). Views from get_shot and
+        get_all_shots are not affected.
+        """
+        return self.shots.stacked()
     
     def clear_shots(self):
         """Clear all shots from memory"""
-        count = len(self.shot_arrays)
-        self.shot_arrays.clear()
+        count = len(self.shots)
+        self.shots.clear()
         print(f"Cleared {count} shots from memory.")
     
     def save_shots_to_file(self, filename="shots_data.npz"):
         """Save all shot arrays to a compressed numpy file"""
-        if len(self.shot_arrays) > 0:
+        if len(self.shots) > 0:
             # Save with metadata
             np.savez_compressed(
                 filename,
-                images=np.array(self.shot_arrays),
-                count=len(self.shot_arrays)
+                images=self.shots.stacked(),
+                count=len(self.shots)
             )
-            print(f"Saved {len(self.shot_arrays)} shots to {filename}")
+            print(f"Saved {len(self.shots)} shots to {filename}")
         else:
             print("No shots to save.")
     
+    def open_archive(self, filename="shots.shots", compress=False):
+        """Append every following shot to an on-disk shot archive"""
+        self.close_archive()
+        self.archive_writer = ShotArchiveWriter(filename, compress=compress)
+        print(f"Archiving shots to {filename}{' (compressed)' if compress else ''}")
+    
+    def close_archive(self):
+        """Finish writing the shot archive"""
+        if self.archive_writer is not None:
+            self.archive_writer.close()
+            print(f"Archive closed with {self.archive_writer.count} new shots")
+            self.archive_writer = None
+    
+    def open_shot_archive(self, filename="shots.shots"):
+        """Open a shot archive for lazy, memory-mapped reading"""
+        try:
+            archive = ShotArchive(filename)
+            print(f"Opened {len(archive)} shots from {filename}")
+            return archive
+        except FileNotFoundError:
+            print(f"Error: File {filename} not found.")
+            return None
+    
     def load_shots_from_file(self, filename="shots_data.npz"):
         """Load shot arrays from a numpy file"""
         try:
             data = np.load(filename)
-            self.shot_arrays = list(data['images'])
-            print(f"Loaded {len(self.shot_arrays)} shots from {filename}")
-            self.imgid = len(self.shot_arrays)
+            images = data['images']
+            capacity = max(self.shots.capacity, len(images))
+            self.shots = ShotRingBuffer(capacity, self.shots.overwrite)
+            for image in images:
+                self.shots.append(image)
+            print(f"Loaded {len(self.shots)} shots from {filename}")
+            self.imgid = len(self.shots)
         except FileNotFoundError:
             print(f"Error: File {filename} not found.")
         except Exception as e:
@@ -1,11 +1,21 @@
 import cv2 as cv
 import numpy as np
+import hashlib
+import json
+import os
+import tempfile
 
-address = [
-    "cat.png",
-]
+# Number of cats on the sprite sheet
+CAT_COUNT = 16
+
+# White background = low saturation and high brightness (HSV)
+WHITE_MAX_SATURATION = 25
+WHITE_MIN_VALUE = 180
+
+# Processed sprites are cached here, keyed by sheet content and the settings above
+SPRITE_CACHE_DIR = os.path.expanduser("~/.cache/cat-head-swap")
+SPRITE_CACHE_VERSION = 1  # bump when make_cat/remove_white_bg change
 
-img = cv.imread(address[0], cv.IMREAD_UNCHANGED)
 
 def make_cat(img, number): 
     """
@@ -38,7 +48,7 @@ def remove_white_bg(img):
     h, s, v = cv.split(hsv)
 
     # White = high brightness, very low saturation
-    mask = (s < 25) & (v > 180)
+    mask = (s < WHITE_MAX_SATURATION) & (v > WHITE_MIN_VALUE)
 
     # Add alpha channel
     rgba = cv.cvtColor(bgr, cv.COLOR_BGR2BGRA)
@@ -49,9 +59,10 @@ def remove_white_bg(img):
     return rgba
 
 
-def cat_paste(bg, fg, x, y):
+def cat_paste_legacy(bg, fg, x, y):
     """
-    Paste a cat head with alpha blending onto background
+    Paste a cat head with float alpha blending onto background
+    (original implementation, kept as the reference for bench_paste.py)
     """
     h, w = fg.shape[:2]
 
@@ -74,19 +85,150 @@ def cat_paste(bg, fg, x, y):
     return bg
 
 
-def load_all_cats(sprite_path):
+def prepare_cat(fg):
+    """
+    Precompute a BGRA sprite for cat_blend
+
+    Returns:
+        (premultiplied BGR, inverse alpha) as uint8 arrays of the same size,
+        premul = bgr * a / 255 and inv_alpha = 255 - a on all 3 channels
+    """
+    alpha = fg[:, :, 3]
+    alpha3 = cv.merge([alpha, alpha, alpha])
+    premul = cv.multiply(np.ascontiguousarray(fg[:, :, :3]), alpha3, scale=1.0 / 255.0)
+    inv_alpha = cv.bitwise_not(alpha3)
+    return premul, inv_alpha
+
+
+def cat_blend(bg, prepared, x, y):
+    """
+    Blend a prepared cat (see prepare_cat) onto background in place
+
+    The sprite is clipped to the frame, so cats overlapping an edge are
+    partially drawn instead of dropped. Both steps are saturating uint8
+    OpenCV ops that write straight into the ROI view, no temporaries.
+    """
+    premul, inv_alpha = prepared
+    h, w = premul.shape[:2]
+    frame_h, frame_w = bg.shape[:2]
+
+    # Clip sprite rectangle to the frame
+    x0 = max(x, 0)
+    y0 = max(y, 0)
+    x1 = min(x + w, frame_w)
+    y1 = min(y + h, frame_h)
+    if x0 >= x1 or y0 >= y1:
+        return bg
+
+    sx0, sy0 = x0 - x, y0 - y
+    sx1, sy1 = sx0 + (x1 - x0), sy0 + (y1 - y0)
+
+    # bg = bg * (255 - a) / 255 + premul
+    roi = bg[y0:y1, x0:x1]
+    cv.multiply(roi, inv_alpha[sy0:sy1, sx0:sx1], dst=roi, scale=1.0 / 255.0)
+    cv.add(roi, premul[sy0:sy1, sx0:sx1], dst=roi)
+    return bg
+
+
+def cat_paste(bg, fg, x, y):
+    """
+    Paste a cat head with alpha blending onto background, clipped to the frame
+    """
+    return cat_blend(bg, prepare_cat(fg), x, y)
+
+
+def _sprite_cache_paths(sprite_bytes, cache_dir):
+    """Cache data and index paths for a sprite sheet and the current settings"""
+    key = hashlib.sha256(sprite_bytes)
+    key.update(json.dumps([SPRITE_CACHE_VERSION, CAT_COUNT,
+                           WHITE_MAX_SATURATION, WHITE_MIN_VALUE]).encode())
+    base = os.path.join(cache_dir, f"cats_{key.hexdigest()[:16]}")
+    return base + ".npy", base + ".json"
+
+
+def _load_sprite_cache(data_path, index_path):
+    """Memory-map cached sprites, None if there is no usable cache"""
+    try:
+        with open(index_path) as f:
+            shapes = json.load(f)
+        data = np.load(data_path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+    cat_faces = []
+    offset = 0
+    for shape in shapes:
+        size = int(np.prod(shape))
+        if offset + size > data.size:
+            return None
+        cat_faces.append(data[offset:offset + size].reshape(shape))
+        offset += size
+    return cat_faces
+
+
+def _save_sprite_cache(cat_faces, data_path, index_path):
+    """
+    Write sprites as one flat array plus their shapes (atomically)
+
+    Temp files get unique names, so processes filling the same cache at
+    once (e.g. batch_render workers) never write into each other's files.
+    """
+    cache_dir = os.path.dirname(data_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    flat = np.concatenate([cat.reshape(-1) for cat in cat_faces])
+    tmp_paths = []
+    try:
+        fd, tmp_data = tempfile.mkstemp(dir=cache_dir, suffix=".tmp.npy")
+        tmp_paths.append(tmp_data)
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, flat)
+        fd, tmp_index = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        tmp_paths.append(tmp_index)
+        with os.fdopen(fd, 'w') as f:
+            json.dump([list(cat.shape) for cat in cat_faces], f)
+        # Index last, so a cache is only visible once its data is complete
+        os.replace(tmp_data, data_path)
+        os.replace(tmp_index, index_path)
+    finally:
+        for path in tmp_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def load_all_cats(sprite_path, cache_dir=SPRITE_CACHE_DIR):
     """
     Load all 16 cat faces from the sprite sheet
+    
+    Processed sprites are cached in cache_dir and memory-mapped on later
+    runs; the cache is rebuilt when the sheet or the settings change.
+    cache_dir=None always processes the sheet. Cached sprites are read-only.
     """
-    sprite = cv.imread(sprite_path, cv.IMREAD_UNCHANGED)
+    try:
+        with open(sprite_path, 'rb') as f:
+            sprite_bytes = f.read()
+    except OSError:
+        raise ValueError(f"Could not load sprite from {sprite_path}")
+    
+    if cache_dir is not None:
+        data_path, index_path = _sprite_cache_paths(sprite_bytes, cache_dir)
+        cat_faces = _load_sprite_cache(data_path, index_path)
+        if cat_faces is not None:
+            return cat_faces
+    
+    sprite = cv.imdecode(np.frombuffer(sprite_bytes, np.uint8), cv.IMREAD_UNCHANGED)
     if sprite is None:
         raise ValueError(f"Could not load sprite from {sprite_path}")
     
     cat_faces = []
-    for i in range(16):
+    for i in range(CAT_COUNT):
         cat = make_cat(sprite, i)
         cat = remove_white_bg(cat)
         cat_faces.append(cat)
     
+    if cache_dir is not None:
+        try:
+            _save_sprite_cache(cat_faces, data_path, index_path)
+        except OSError as e:
+            print(f"Could not write sprite cache: {e}")
+    
     return cat_faces
-
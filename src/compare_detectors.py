@@ -0,0 +1,200 @@
+import argparse
+import contextlib
+import json
+import sys
+import time
+
+import cv2 as cv
+import numpy as np
+
+from benchmark import (Timings, frames_from_npz, frames_from_archive, frames_from_video,
+                       synthetic_frames, git_commit, pi_model)
+from face_detection import DETECTOR_BACKENDS, FaceDetector, box_iou
+
+
+def match_boxes(found, truth, iou_threshold=0.3):
+    """
+    Greedily pair detections with reference boxes by IoU
+
+    Returns:
+        Number of reference boxes that got a detection
+    """
+    pairs = []
+    for i, a in enumerate(found):
+        for j, b in enumerate(truth):
+            iou = box_iou(a, b)
+            if iou >= iou_threshold:
+                pairs.append((iou, i, j))
+    pairs.sort(reverse=True)
+
+    used_found = set()
+    used_truth = set()
+    for _, i, j in pairs:
+        if i in used_found or j in used_truth:
+            continue
+        used_found.add(i)
+        used_truth.add(j)
+    return len(used_truth)
+
+
+def compare_backends(frames, backends, reference="haar", truth=None, detect_kwargs=None,
+                     model_path=None, warmup=3, iou_threshold=0.3):
+    """
+    Time every backend on the same frames and score it against a reference
+
+    The reference is the ground truth boxes per frame if given, otherwise
+    the detections of the reference backend with the same settings.
+    Backends that cannot be loaded (e.g. no DNN model file) are reported
+    as skipped.
+
+    Returns:
+        dict: backend -> {"ms": ..., "recall": ..., "precision": ...} or {"skipped": reason}
+    """
+    detect_kwargs = detect_kwargs or {'scale_factor': 1.1, 'min_neighbors': 5, 'min_size': (50, 50)}
+    detectors = {}
+    report = {}
+    names = list(backends)
+    if truth is None and reference not in names:
+        names.append(reference)
+    for name in names:
+        try:
+            detectors[name] = FaceDetector(backend=name, model_path=model_path if name == "dnn" else None)
+        except (ValueError, FileNotFoundError) as e:
+            report[name] = {'skipped': str(e).splitlines()[0]}
+    if truth is None and reference not in detectors:
+        raise ValueError(f"Reference backend {reference} is not available: {report[reference]['skipped']}")
+
+    timings = Timings()
+    found_counts = {name: 0 for name in detectors}
+    matched = {name: 0 for name in detectors}
+    reference_count = 0
+    frame_count = 0
+
+    for index, frame in enumerate(frames):
+        results = {}
+        for name, detector in detectors.items():
+            start = time.perf_counter()
+            results[name] = detector.detect_faces(frame, **detect_kwargs)
+            if index >= warmup:
+                timings.add(name, time.perf_counter() - start)
+
+        if index < warmup:
+            continue
+        if truth is not None:
+            if index >= len(truth):
+                break
+            expected = truth[index]
+        else:
+            expected = results[reference]
+        frame_count += 1
+        reference_count += len(expected)
+        for name, found in results.items():
+            found_counts[name] += len(found)
+            matched[name] += match_boxes(found, expected, iou_threshold)
+
+    summary = timings.summary()
+    for name in detectors:
+        if name not in backends:
+            continue
+        stats = summary.get(name, {})
+        report[name] = {
+            'ms': stats.get('mean_ms', 0.0),
+            'p95_ms': stats.get('p95_ms', 0.0),
+            'recall': matched[name] / reference_count if reference_count else 0.0,
+            'precision': matched[name] / found_counts[name] if found_counts[name] else 0.0,
+            'faces_per_frame': found_counts[name] / frame_count if frame_count else 0.0,
+        }
+
+    print(f"{frame_count} frames, {reference_count} reference faces "
+          f"({'ground truth' if truth is not None else reference})", file=sys.stderr)
+    for name in backends:
+        row = report[name]
+        if 'skipped' in row:
+            print(f"{name:<6} skipped: {row['skipped']}", file=sys.stderr)
+        else:
+            print(f"{name:<6} {row['ms']:8.2f} ms/frame  recall {row['recall']*100:5.1f}%  "
+                  f"precision {row['precision']*100:5.1f}%", file=sys.stderr)
+    return {name: report[name] for name in backends}
+
+
+def load_truth(path):
+    """Ground truth boxes: a JSON list with one list of [x, y, w, h] per frame"""
+    with open(path) as f:
+        return [[tuple(box) for box in frame] for frame in json.load(f)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare face detector backends on recorded footage")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--npz", help="shot archive from CameraController.save_shots_to_file")
+    source.add_argument("--archive", help="shot archive from CameraController.open_archive")
+    source.add_argument("--video", help="video file to replay")
+    source.add_argument("--synthetic", type=int, metavar="N", default=100,
+                        help="number of synthetic frames (default)")
+    parser.add_argument("--face-image", default="hollywoof.png",
+                        help="image with faces used for synthetic frames")
+    parser.add_argument("--size", default="1280x720", help="synthetic frame size WxH")
+    parser.add_argument("--limit", type=int, default=None, help="max frames to read")
+    parser.add_argument("--backends", default=",".join(DETECTOR_BACKENDS),
+                        help="comma separated backends to compare")
+    parser.add_argument("--reference", default="haar", choices=DETECTOR_BACKENDS,
+                        help="backend whose boxes count as the truth (without --truth)")
+    parser.add_argument("--truth", default=None,
+                        help="JSON ground truth, one list of [x, y, w, h] per frame")
+    parser.add_argument("--model", default=None, help="DNN model file")
+    parser.add_argument("--detect-scale", type=float, default=1.0, help="detect on a downscaled frame")
+    parser.add_argument("--warmup", type=int, default=3, help="frames excluded from stats")
+    parser.add_argument("--output", "-o", default=None, help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    if args.npz:
+        frames = frames_from_npz(args.npz, args.limit)
+        input_desc = {'type': 'npz', 'path': args.npz}
+    elif args.archive:
+        frames = frames_from_archive(args.archive, args.limit)
+        input_desc = {'type': 'archive', 'path': args.archive}
+    elif args.video:
+        frames = frames_from_video(args.video, args.limit)
+        input_desc = {'type': 'video', 'path': args.video}
+    else:
+        width, height = (int(v) for v in args.size.lower().split('x'))
+        frames = synthetic_frames(args.face_image, count=args.synthetic, size=(width, height))
+        input_desc = {'type': 'synthetic', 'count': args.synthetic, 'size': [width, height],
+                      'face_image': args.face_image}
+
+    backends = [name.strip() for name in args.backends.split(',') if name.strip()]
+    truth = load_truth(args.truth) if args.truth else None
+    detect_kwargs = {'scale_factor': 1.1, 'min_neighbors': 5, 'min_size': (50, 50),
+                     'detect_scale': args.detect_scale}
+
+    # Components print progress, keep stdout for the JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        report = compare_backends(frames, backends, reference=args.reference, truth=truth,
+                                  detect_kwargs=detect_kwargs, model_path=args.model,
+                                  warmup=args.warmup)
+
+    result = {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'commit': git_commit(),
+            'pi_model': pi_model(),
+            'opencv': cv.__version__,
+            'numpy': np.__version__,
+        },
+        'input': input_desc,
+        'reference': 'truth' if truth is not None else args.reference,
+        'detect_kwargs': {k: list(v) if isinstance(v, tuple) else v for k, v in detect_kwargs.items()},
+        'backends': report,
+    }
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+        print(f"Comparison written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,50 +2,150 @@
 import cv2 as cv
 import numpy as np
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Backends selectable with FaceDetector(backend=...)
+DETECTOR_BACKENDS = ("haar", "lbp", "dnn")
+
+# Model files each backend looks for when no path is given
+HAAR_CASCADE_FILE = 'haarcascade_frontalface_default.xml'
+LBP_CASCADE_FILE = 'lbpcascade_frontalface_improved.xml'
+DNN_MODEL_FILE = 'face_detection_yunet_2023mar.onnx'
+
+DOWNLOAD_URLS = {
+    HAAR_CASCADE_FILE: "https://github.com/opencv/opencv/raw/master/data/haarcascades/" + HAAR_CASCADE_FILE,
+    LBP_CASCADE_FILE: "https://github.com/opencv/opencv/raw/master/data/lbpcascades/" + LBP_CASCADE_FILE,
+    DNN_MODEL_FILE: "https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/" + DNN_MODEL_FILE,
+}
+
+
+class CascadeBackend:
+    """Haar or LBP cascade, both run through cv.CascadeClassifier"""
+    color = False
+
+    def __init__(self, path):
+        self.path = path
+        self.cascade = cv.CascadeClassifier(path)
+        if self.cascade.empty():
+            raise ValueError(f"Could not load cascade classifier from {path}")
+
+    def clone(self):
+        """Separate instance for another thread (detectMultiScale is not thread safe)"""
+        return CascadeBackend(self.path)
+
+    def detect(self, image, scale_factor, min_neighbors, min_size, max_size=(0, 0)):
+        return self.cascade.detectMultiScale(
+            image,
+            scaleFactor=scale_factor,
+            minNeighbors=min_neighbors,
+            minSize=min_size,
+            maxSize=max_size,
+            flags=cv.CASCADE_SCALE_IMAGE
+        )
+
+
+class DnnBackend:
+    """
+    OpenCV's CPU DNN face detector (YuNet through cv.FaceDetectorYN)
+
+    Works on color images; grayscale input (e.g. the YUV luma plane) is
+    expanded to 3 channels. scale_factor and min_neighbors do not apply,
+    score_threshold plays their part.
+    """
+    color = True
+
+    def __init__(self, path, score_threshold=0.6, nms_threshold=0.3):
+        if not hasattr(cv, 'FaceDetectorYN'):
+            raise ValueError(f"OpenCV {cv.__version__} has no FaceDetectorYN (needs 4.5.4 or newer)")
+        self.path = path
+        self.score_threshold = score_threshold
+        self.nms_threshold = nms_threshold
+        self.net = cv.FaceDetectorYN.create(path, "", (320, 320), score_threshold, nms_threshold)
+        self.input_size = (320, 320)
+
+    def clone(self):
+        return DnnBackend(self.path, self.score_threshold, self.nms_threshold)
+
+    def detect(self, image, scale_factor, min_neighbors, min_size, max_size=(0, 0)):
+        if len(image.shape) == 2:
+            image = cv.cvtColor(image, cv.COLOR_GRAY2BGR)
+        size = (image.shape[1], image.shape[0])
+        if size != self.input_size:
+            self.net.setInputSize(size)
+            self.input_size = size
+        _, found = self.net.detect(image)
+        if found is None:
+            return np.empty((0, 4), dtype=np.int32)
+
+        boxes = np.round(found[:, :4]).astype(np.int32)
+        keep = (boxes[:, 2] >= min_size[0]) & (boxes[:, 3] >= min_size[1])
+        if max_size[0] > 0 and max_size[1] > 0:
+            keep &= (boxes[:, 2] <= max_size[0]) & (boxes[:, 3] <= max_size[1])
+        return boxes[keep]
 
 
 class FaceDetector:
-    def __init__(self, cascade_path=None):
+    def __init__(self, cascade_path=None, backend="haar", model_path=None):
         """
         Initialize face detector
+        
+        backend is "haar" (most reliable), "lbp" (much faster, a bit
+        less accurate) or "dnn" (OpenCV's YuNet face detector, needs the
+        model file). cascade_path / model_path override the file search.
         """
-        if cascade_path is None:
+        if backend not in DETECTOR_BACKENDS:
+            raise ValueError(f"Unknown detector backend {backend}, choose from {DETECTOR_BACKENDS}")
+        
+        if backend == "dnn":
+            path = model_path or self._find_model_file(DNN_MODEL_FILE)
+            self.backend = DnnBackend(path)
+        else:
+            filename = HAAR_CASCADE_FILE if backend == "haar" else LBP_CASCADE_FILE
             # Try multiple common locations for the cascade file
-            cascade_path = self._find_cascade_file()
+            path = cascade_path or self._find_cascade_file(filename)
+            self.backend = CascadeBackend(path)
         
-        self.face_cascade = cv.CascadeClassifier(cascade_path)
+        self.backend_name = backend
+        self.cascade_path = path
         
-        if self.face_cascade.empty():
-            raise ValueError(f"Could not load cascade classifier from {cascade_path}")
+        # Tiled detection: worker threads, each with its own backend instance
+        self._pool = None
+        self._pool_size = 0
+        self._thread_local = threading.local()
         
-        print(f"Face detector initialized using: {cascade_path}")
+        print(f"Face detector ({backend}) initialized using: {path}")
     
-    def _find_cascade_file(self):
+    def _find_cascade_file(self, filename=HAAR_CASCADE_FILE):
         """
-        Try to find the Haar Cascade XML file in common locations
+        Try to find a cascade XML file in common locations
         I added all the possible paths because they are very unreliable
         """
+        subdir = 'lbpcascades' if filename.startswith('lbp') else 'haarcascades'
+        
         # List of possible locations
         possible_paths = [
             # Try OpenCV's data directory (newer versions)
-            '/usr/share/opencv4/haarcascades/haarcascade_frontalface_default.xml',
+            f'/usr/share/opencv4/{subdir}/{filename}',
             
             # Older OpenCV versions
-            '/usr/share/opencv/haarcascades/haarcascade_frontalface_default.xml',
-            '/usr/local/share/opencv4/haarcascades/haarcascade_frontalface_default.xml',
-            '/usr/local/share/opencv/haarcascades/haarcascade_frontalface_default.xml',
+            f'/usr/share/opencv/{subdir}/{filename}',
+            f'/usr/local/share/opencv4/{subdir}/{filename}',
+            f'/usr/local/share/opencv/{subdir}/{filename}',
             
             # Current directory (if user downloaded it)
-            'haarcascade_frontalface_default.xml',
-            './haarcascade_frontalface_default.xml',
+            filename,
+            f'./{filename}',
             
             # Home directory
-            os.path.expanduser('~/haarcascade_frontalface_default.xml'),
+            os.path.expanduser(f'~/{filename}'),
         ]
         
-        # Try to use cv2.data if available (Python package installations)
+        # Try to use cv2.data if available (Python package installations,
+        # these only ship the Haar cascades)
         try:
-            data_path = cv.data.haarcascades + 'haarcascade_frontalface_default.xml'
+            data_path = cv.data.haarcascades + filename
             possible_paths.insert(0, data_path)
         except AttributeError:
             pass  # cv2.data not available
@@ -58,9 +158,9 @@ class FaceDetector:
         
         # If nothing found, provide helpful error message
         error_msg = (
-            "Could not find haarcascade_frontalface_default.xml\n"
+            f"Could not find {filename}\n"
             "Please download it from:\n"
-            "https://github.com/opencv/opencv/raw/master/data/haarcascades/haarcascade_frontalface_default.xml\n"
+            f"{DOWNLOAD_URLS[filename]}\n"
             "And place it in the same directory as this script.\n\n"
             "Or install it with:\n"
             "sudo apt-get install opencv-data\n\n"
@@ -68,30 +168,132 @@ class FaceDetector:
         )
         raise FileNotFoundError(error_msg)
     
-    def detect_faces(self, frame, scale_factor=1.1, min_neighbors=5, min_size=(50, 50)):
+    def _find_model_file(self, filename=DNN_MODEL_FILE):
+        """Look for a DNN model file in the working directory, next to this script and in ~/models"""
+        possible_paths = [
+            filename,
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), filename),
+            os.path.expanduser(f'~/models/{filename}'),
+            os.path.expanduser(f'~/{filename}'),
+        ]
+        for path in possible_paths:
+            if os.path.exists(path):
+                print(f"Found model file at: {path}")
+                return path
+        raise FileNotFoundError(
+            f"Could not find {filename}\n"
+            f"Please download it from:\n{DOWNLOAD_URLS[filename]}\n\n"
+            "Tried these locations:\n" + "\n".join(possible_paths))
+    
+    def detect_faces(self, frame, scale_factor=1.1, min_neighbors=5, min_size=(50, 50),
+                     detect_scale=1.0, full_size=None, tiles=None, tile_overlap=None):
         """
         Detect faces in a frame
         
+        detect_scale < 1 runs the cascade on a downscaled copy of the frame.
+        full_size=(width, height) says the frame is a low resolution stream
+        (e.g. the camera "lores" stream) of a bigger output frame.
+        Either way min_size is given and boxes are returned in full
+        resolution coordinates.
+        
+        tiles=(cols, rows) splits detection over overlapping tiles on a
+        thread pool, see _detect_tiled.
+        
         Returns:
             Array of face rectangles [(x, y, w, h), ...]
         """
-        # Convert to grayscale for detection
-        if len(frame.shape) == 3:
+        # Convert to grayscale for detection (the DNN backend wants color)
+        if len(frame.shape) == 3 and not self.backend.color:
             gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
         else:
             gray = frame
         
+        if full_size is None:
+            full_size = (gray.shape[1], gray.shape[0])
+        
+        # Downscale for detection
+        if detect_scale != 1.0:
+            small_w = max(1, int(round(gray.shape[1] * detect_scale)))
+            small_h = max(1, int(round(gray.shape[0] * detect_scale)))
+            gray = cv.resize(gray, (small_w, small_h), interpolation=cv.INTER_AREA)
+        
+        # Ratio between output coordinates and detection coordinates
+        ratio_x = full_size[0] / gray.shape[1]
+        ratio_y = full_size[1] / gray.shape[0]
+        detect_min_size = (max(1, int(round(min_size[0] / ratio_x))),
+                           max(1, int(round(min_size[1] / ratio_y))))
+        
         # Detect faces
-        faces = self.face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=scale_factor,
-            minNeighbors=min_neighbors,
-            minSize=min_size,
-            flags=cv.CASCADE_SCALE_IMAGE
-        )
+        if tiles is not None and tiles[0] * tiles[1] > 1:
+            faces = self._detect_tiled(gray, tiles, tile_overlap, scale_factor,
+                                       min_neighbors, detect_min_size)
+        else:
+            faces = self.backend.detect(gray, scale_factor, min_neighbors, detect_min_size)
+        
+        # Map boxes back to full resolution
+        if len(faces) > 0 and (ratio_x != 1.0 or ratio_y != 1.0):
+            scale = np.array([ratio_x, ratio_y, ratio_x, ratio_y])
+            faces = np.round(faces * scale).astype(np.int32)
         
         return faces
     
+    def _worker_backend(self):
+        """Detector owned by the calling thread (detectMultiScale is not thread safe)"""
+        backend = getattr(self._thread_local, 'backend', None)
+        if backend is None:
+            backend = self.backend.clone()
+            self._thread_local.backend = backend
+        return backend
+    
+    def _detect_tiled(self, gray, tiles, overlap, scale_factor, min_neighbors, min_size):
+        """
+        Detect on overlapping tiles in parallel and merge seam duplicates
+        
+        Tiles overlap by `overlap` pixels (default: half a tile) and only
+        look for faces up to that size, so every such face fits whole in
+        at least one tile. Bigger faces are found by one extra full-frame
+        band starting a bit below that size, which is cheap because the
+        cascade skips all the small scales. The size ranges overlap so
+        faces near the limit still get enough neighbor hits in one band.
+        """
+        cols, rows = tiles
+        frame_h, frame_w = gray.shape[:2]
+        tile_w = -(-frame_w // cols)
+        tile_h = -(-frame_h // rows)
+        if overlap is None:
+            overlap = min(tile_w, tile_h) // 2
+        overlap = max(overlap, min_size[0], min_size[1])
+        max_size = (overlap, overlap)
+        
+        jobs = []
+        for r in range(rows):
+            for c in range(cols):
+                x0 = max(0, c * tile_w - overlap // 2)
+                y0 = max(0, r * tile_h - overlap // 2)
+                x1 = min(frame_w, (c + 1) * tile_w + overlap // 2)
+                y1 = min(frame_h, (r + 1) * tile_h + overlap // 2)
+                jobs.append((x0, y0, gray[y0:y1, x0:x1], min_size, max_size))
+        # Large faces band over the whole frame
+        band_min = max(min_size[0], int(overlap * 0.6))
+        jobs.append((0, 0, gray, (band_min, band_min), (0, 0)))
+        
+        def run(job):
+            x0, y0, image, job_min, job_max = job
+            found = self._worker_backend().detect(image, scale_factor, min_neighbors,
+                                                  job_min, job_max)
+            return [(x + x0, y + y0, w, h) for (x, y, w, h) in found]
+        
+        if self._pool is None or self._pool_size != len(jobs):
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+            self._pool = ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="detect-tile")
+            self._pool_size = len(jobs)
+        
+        boxes = []
+        for found in self._pool.map(run, jobs):
+            boxes.extend(found)
+        return merge_boxes(boxes)
+    
     def draw_face_boxes(self, frame, faces, color=(0, 255, 0), thickness=2):
         """
         Draw rectangles around detected faces (for debugging)
@@ -132,3 +334,317 @@ class FaceDetector:
         # Find face with largest area
         largest = max(faces, key=lambda f: f[2] * f[3])
         return tuple(largest)
+
+
+def merge_boxes(boxes, iou_threshold=0.3, containment_threshold=0.7):
+    """
+    Non-maximum suppression for boxes without scores
+    
+    Boxes are visited largest first; every box that overlaps a kept box
+    by IoU or is mostly inside it joins that box's group, and each group
+    is replaced by its mean box.
+    
+    Returns:
+        Array of merged (x, y, w, h) boxes
+    """
+    boxes = sorted((tuple(int(v) for v in b) for b in boxes), key=lambda b: b[2] * b[3], reverse=True)
+    groups = []
+    for box in boxes:
+        for group in groups:
+            keep = group[0]
+            ix = max(0, min(keep[0] + keep[2], box[0] + box[2]) - max(keep[0], box[0]))
+            iy = max(0, min(keep[1] + keep[3], box[1] + box[3]) - max(keep[1], box[1]))
+            inside = ix * iy / float(min(keep[2] * keep[3], box[2] * box[3]))
+            if box_iou(keep, box) >= iou_threshold or inside >= containment_threshold:
+                group.append(box)
+                break
+        else:
+            groups.append([box])
+    
+    merged = [np.round(np.mean(group, axis=0)).astype(np.int32) for group in groups]
+    return np.array(merged, dtype=np.int32).reshape(-1, 4)
+
+
+def box_iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+class FaceTracker:
+    def __init__(self, face_detector, detect_interval=5, iou_threshold=0.3,
+                 max_missed=2, min_points=6):
+        """
+        Run full detection every detect_interval frames and follow faces
+        with sparse optical flow in between
+
+        Every track keeps a stable ID, so callers can keep the same cat
+        on the same person. With full_size in detect_kwargs the frame may
+        be smaller than the output (e.g. a lores stream), boxes are kept
+        in full_size coordinates.
+        """
+        self.face_detector = face_detector
+        self.detect_interval = max(1, detect_interval)
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed    # detections a track may miss before removal
+        self.min_points = min_points    # flow points needed to keep tracking a face
+        self.tracks = {}                # id -> {'box', 'points', 'missed'}
+        self.next_id = 0
+        self.prev_gray = None
+        self.frame_count = 0
+        self.last_was_detection = False
+        self.ratio = (1.0, 1.0)         # output / frame size
+
+    def reset(self):
+        """Forget all tracks; next update runs a full detection"""
+        self.tracks.clear()
+        self.prev_gray = None
+        self.frame_count = 0
+
+    def update(self, frame, **detect_kwargs):
+        """
+        Detect or track faces in the next frame
+
+        Returns:
+            (faces, track_ids) - list of (x, y, w, h) and matching list of IDs
+        """
+        if len(frame.shape) == 3:
+            gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
+        else:
+            gray = frame
+
+        full_size = detect_kwargs.get('full_size')
+        if full_size:
+            self.ratio = (full_size[0] / gray.shape[1], full_size[1] / gray.shape[0])
+        else:
+            self.ratio = (1.0, 1.0)
+
+        due = self.frame_count % self.detect_interval == 0
+        if due or self.prev_gray is None or not self.tracks:
+            faces = self.face_detector.detect_faces(gray, **detect_kwargs)
+            self._match_detections(gray, faces)
+            self.last_was_detection = True
+        else:
+            self._propagate(gray)
+            self.last_was_detection = False
+
+        self.prev_gray = gray
+        self.frame_count += 1
+
+        track_ids = sorted(self.tracks)
+        faces = [self.tracks[tid]['box'] for tid in track_ids]
+        return faces, track_ids
+
+    def _match_detections(self, gray, faces):
+        """Greedily pair detections with tracks by IoU, start and drop tracks"""
+        faces = [tuple(int(v) for v in face) for face in faces]
+        pairs = []
+        for tid, track in self.tracks.items():
+            for i, face in enumerate(faces):
+                iou = box_iou(track['box'], face)
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, tid, i))
+        pairs.sort(reverse=True)
+
+        matched_tracks = set()
+        matched_faces = set()
+        for _, tid, i in pairs:
+            if tid in matched_tracks or i in matched_faces:
+                continue
+            # Snap to the fresh detection to remove accumulated drift
+            self.tracks[tid]['box'] = faces[i]
+            self.tracks[tid]['missed'] = 0
+            matched_tracks.add(tid)
+            matched_faces.add(i)
+
+        for tid in list(self.tracks):
+            if tid not in matched_tracks:
+                self.tracks[tid]['missed'] += 1
+                if self.tracks[tid]['missed'] > self.max_missed:
+                    del self.tracks[tid]
+
+        # Faces that appeared since the last detection
+        for i, face in enumerate(faces):
+            if i not in matched_faces:
+                self.tracks[self.next_id] = {'box': face, 'missed': 0}
+                self.next_id += 1
+
+        for track in self.tracks.values():
+            track['points'] = self._find_points(gray, track['box'])
+
+    def _find_points(self, gray, box):
+        """Pick corners inside the central part of a face box to follow"""
+        x, y, w, h = box
+        if self.ratio != (1.0, 1.0):
+            rx, ry = self.ratio
+            x, y, w, h = int(x / rx), int(y / ry), int(w / rx), int(h / ry)
+        mask = np.zeros(gray.shape, dtype=np.uint8)
+        mask[max(0, y + h // 6):max(0, y + h - h // 6),
+             max(0, x + w // 6):max(0, x + w - w // 6)] = 255
+        return cv.goodFeaturesToTrack(gray, maxCorners=30, qualityLevel=0.01,
+                                      minDistance=5, mask=mask)
+
+    def _propagate(self, gray):
+        """Move every track by the median optical flow of its points"""
+        rx, ry = self.ratio
+        frame_h = gray.shape[0] * ry
+        frame_w = gray.shape[1] * rx
+        for tid in list(self.tracks):
+            track = self.tracks[tid]
+            points = track.get('points')
+            if points is None or len(points) < self.min_points:
+                # Nothing to follow, keep box until next detection
+                continue
+
+            new_points, status, _ = cv.calcOpticalFlowPyrLK(
+                self.prev_gray, gray, points, None, winSize=(21, 21), maxLevel=2)
+            good = status.reshape(-1) == 1
+            if good.sum() < self.min_points:
+                # Lost the face, it comes back with the next detection if still there
+                del self.tracks[tid]
+                continue
+
+            shift = np.median(new_points[good] - points[good], axis=0).reshape(-1)
+            x, y, w, h = track['box']
+            x = int(round(x + shift[0] * rx))
+            y = int(round(y + shift[1] * ry))
+
+            # Drop tracks that left the frame
+            if x + w <= 0 or y + h <= 0 or x >= frame_w or y >= frame_h:
+                del self.tracks[tid]
+                continue
+
+            track['box'] = (x, y, w, h)
+            track['points'] = new_points[good].reshape(-1, 1, 2)
+
+
+class RoiFaceDetector:
+    def __init__(self, face_detector, margin=0.5, full_sweep_interval=15, log_interval=0,
+                 max_window_fraction=0.6):
+        """
+        Run the cascade only in windows around the previous faces
+
+        Windows are the previous boxes grown by margin * size on every
+        side. A full frame sweep runs every full_sweep_interval calls,
+        when there are no previous faces, or when a window lost its face,
+        so new arrivals are still found. When the windows cover more than
+        max_window_fraction of the frame (crowds) they would save little
+        and risk a second, full scan, so the frame is swept right away.
+        Has the same detect_faces call as FaceDetector, so it can be used
+        inside FaceTracker.
+        """
+        self.face_detector = face_detector
+        self.margin = margin
+        self.full_sweep_interval = max(1, full_sweep_interval)
+        self.log_interval = log_interval
+        self.max_window_fraction = max_window_fraction
+        self.prev_faces = []
+        self.calls = 0
+        self.full_sweeps = 0
+        self.last_scan_fraction = 1.0
+        self.total_scan_fraction = 0.0
+
+    def _windows(self, faces, frame_w, frame_h):
+        """Expanded, clipped and merged search windows as [x0, y0, x1, y1, face count]"""
+        windows = []
+        for (x, y, w, h) in faces:
+            mx = int(w * self.margin)
+            my = int(h * self.margin)
+            windows.append([max(0, x - mx), max(0, y - my),
+                            min(frame_w, x + w + mx), min(frame_h, y + h + my), 1])
+
+        # Merge overlapping windows so no area is scanned twice
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(windows)):
+                for j in range(i + 1, len(windows)):
+                    a, b = windows[i], windows[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        windows[i] = [min(a[0], b[0]), min(a[1], b[1]),
+                                      max(a[2], b[2]), max(a[3], b[3]), a[4] + b[4]]
+                        del windows[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return windows
+
+    def detect_faces(self, frame, **detect_kwargs):
+        """
+        Detect faces, scanning only around known faces when possible
+        
+        Returns:
+            Array of face rectangles [(x, y, w, h), ...] in full resolution
+        """
+        if len(frame.shape) == 3:
+            gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
+        else:
+            gray = frame
+        frame_h, frame_w = gray.shape[:2]
+
+        # Boxes are in output coordinates, windows in gray coordinates
+        full_size = detect_kwargs.pop('full_size', None) or (frame_w, frame_h)
+        ratio_x = full_size[0] / frame_w
+        ratio_y = full_size[1] / frame_h
+
+        sweep_due = self.calls % self.full_sweep_interval == 0
+        faces = None
+        scanned = 0
+        windows = []
+        if not sweep_due and len(self.prev_faces) > 0:
+            gray_boxes = [(int(x / ratio_x), int(y / ratio_y), int(w / ratio_x), int(h / ratio_y))
+                          for (x, y, w, h) in self.prev_faces]
+            windows = self._windows(gray_boxes, frame_w, frame_h)
+            window_area = sum((x1 - x0) * (y1 - y0) for (x0, y0, x1, y1, _) in windows)
+            if window_area > self.max_window_fraction * frame_w * frame_h:
+                windows = []
+        if windows:
+            faces = []
+            for (x0, y0, x1, y1, count) in windows:
+                scanned += (x1 - x0) * (y1 - y0)
+                found = self.face_detector.detect_faces(
+                    gray[y0:y1, x0:x1],
+                    full_size=(int(round((x1 - x0) * ratio_x)), int(round((y1 - y0) * ratio_y))),
+                    **detect_kwargs)
+                if len(found) < count:
+                    # A face left its window, look everywhere instead
+                    faces = None
+                    break
+                for (x, y, w, h) in found:
+                    faces.append((int(x + x0 * ratio_x), int(y + y0 * ratio_y), int(w), int(h)))
+
+        if faces is None:
+            faces = [tuple(int(v) for v in face)
+                     for face in self.face_detector.detect_faces(gray, full_size=full_size,
+                                                                 **detect_kwargs)]
+            # Windows scanned before falling back count too
+            scanned += frame_w * frame_h
+            self.full_sweeps += 1
+
+        self.prev_faces = faces
+        self.calls += 1
+        self.last_scan_fraction = scanned / float(frame_w * frame_h)
+        self.total_scan_fraction += self.last_scan_fraction
+
+        if self.log_interval and self.calls % self.log_interval == 0:
+            stats = self.get_stats()
+            print(f"ROI detection: scanned {self.last_scan_fraction * 100:.1f}% of frame "
+                  f"(mean {stats['mean_scan_fraction'] * 100:.1f}%, "
+                  f"{stats['full_sweeps']}/{stats['calls']} full sweeps)")
+
+        return np.array(faces, dtype=np.int32).reshape(-1, 4)
+
+    def get_stats(self):
+        """Get scanned area statistics"""
+        return {
+            'calls': self.calls,
+            'full_sweeps': self.full_sweeps,
+            'last_scan_fraction': self.last_scan_fraction,
+            'mean_scan_fraction': self.total_scan_fraction / self.calls if self.calls > 0 else 1.0,
+        }
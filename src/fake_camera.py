@@ -0,0 +1,156 @@
+import time
+
+import cv2 as cv
+import numpy as np
+
+
+def bgr_to_i420(bgr):
+    """BGR image to a planar YUV420 (I420) array of shape (h*3/2, w), like Picamera2"""
+    return cv.cvtColor(bgr, cv.COLOR_BGR2YUV_I420)
+
+
+class FakePicamera2:
+    """
+    Stand-in for Picamera2 so CameraController can run without hardware
+
+    Frames come from a video file, a still image (slowly panned so
+    trackers see motion) or a synthetic moving pattern, are resized to
+    each configured stream and returned in the stream's format:
+    "RGB888" as RGB (what the rest of this project expects),
+    "XRGB8888" as 4 channel and "YUV420" as an I420 array.
+    """
+
+    def __init__(self, camid=0, source=None, fps=30.0):
+        self.camid = camid
+        self.fps = fps
+        self.config = self.create_preview_configuration()
+        self.started = False
+        self.frame_index = 0
+        self.last_capture = 0.0
+        self.cap = None
+        self.image = None
+        if source is not None:
+            image = cv.imread(source)
+            if image is not None:
+                self.image = image
+            else:
+                self.cap = cv.VideoCapture(source)
+                if not self.cap.isOpened():
+                    raise ValueError(f"Could not open fake camera source {source}")
+
+    # ---- configuration, same call shapes as Picamera2 ----
+    def _configuration(self, main, lores, buffer_count, default_size, default_format, **kwargs):
+        main = dict(main or {})
+        main.setdefault("size", default_size)
+        main.setdefault("format", default_format)
+        config = {"main": main, "lores": None, "buffer_count": buffer_count}
+        if lores is not None:
+            lores = dict(lores)
+            lores.setdefault("format", "YUV420")
+            config["lores"] = lores
+        config.update(kwargs)
+        return config
+
+    def create_preview_configuration(self, main=None, lores=None, buffer_count=4, **kwargs):
+        return self._configuration(main, lores, buffer_count, (640, 480), "XBGR8888", **kwargs)
+
+    def create_video_configuration(self, main=None, lores=None, buffer_count=6, **kwargs):
+        return self._configuration(main, lores, buffer_count, (1280, 720), "XBGR8888", **kwargs)
+
+    def create_still_configuration(self, main=None, lores=None, buffer_count=1, **kwargs):
+        return self._configuration(main, lores, buffer_count, (1920, 1080), "BGR888", **kwargs)
+
+    def configure(self, config):
+        if self.started:
+            raise RuntimeError("Camera must be stopped before configuring")
+        self.config = config
+
+    def start(self, *args, **kwargs):
+        self.started = True
+
+    def stop(self):
+        self.started = False
+
+    def start_preview(self, *args, **kwargs):
+        pass
+
+    def stop_preview(self):
+        pass
+
+    def close(self):
+        self.stop()
+        if self.cap is not None:
+            self.cap.release()
+
+    # ---- capture ----
+    def _next_source_frame(self, size):
+        width, height = size
+        if self.cap is not None:
+            ret, frame = self.cap.read()
+            if not ret:
+                # Loop the video
+                self.cap.set(cv.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = self.cap.read()
+            return cv.resize(frame, (width, height), interpolation=cv.INTER_AREA)
+
+        if self.image is not None:
+            frame = cv.resize(self.image, (width, height), interpolation=cv.INTER_AREA)
+            shift = int(20 * np.sin(self.frame_index / 15.0))
+            return np.roll(frame, shift, axis=1)
+
+        # Moving gradient with a bright square
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[:] = ((x + self.frame_index * 4) % 256).astype(np.uint8)[None, :, None]
+        side = height // 4
+        left = (self.frame_index * 5) % max(1, width - side)
+        frame[height // 3:height // 3 + side, left:left + side] = (40, 180, 240)
+        return frame
+
+    def _convert(self, bgr, fmt):
+        if fmt == "YUV420":
+            return bgr_to_i420(bgr)
+        if fmt in ("XRGB8888", "XBGR8888"):
+            return cv.cvtColor(bgr, cv.COLOR_BGR2RGBA)
+        return cv.cvtColor(bgr, cv.COLOR_BGR2RGB)
+
+    def _wait_frame_time(self):
+        """Pace captures like a real sensor"""
+        delay = 1.0 / self.fps - (time.time() - self.last_capture)
+        if delay > 0:
+            time.sleep(delay)
+        self.last_capture = time.time()
+
+    def capture_arrays(self, names=("main",)):
+        """All requested streams of the same frame, plus metadata (like Picamera2)"""
+        if not self.started:
+            raise RuntimeError("Camera not started")
+        self._wait_frame_time()
+        main = self.config["main"]
+        bgr = self._next_source_frame(main["size"])
+        self.frame_index += 1
+
+        arrays = []
+        for name in names:
+            stream = self.config.get(name)
+            if stream is None:
+                raise ValueError(f"Stream {name} is not configured")
+            frame = bgr
+            if tuple(stream["size"]) != tuple(main["size"]):
+                frame = cv.resize(bgr, tuple(stream["size"]), interpolation=cv.INTER_AREA)
+            arrays.append(self._convert(frame, stream.get("format", "RGB888")))
+        metadata = {"SensorTimestamp": int(time.time() * 1e9), "FrameIndex": self.frame_index}
+        return arrays, metadata
+
+    def capture_array(self, name="main"):
+        arrays, _ = self.capture_arrays([name])
+        return arrays[0]
+
+    def capture_file(self, filename):
+        arrays, _ = self.capture_arrays(["main"])
+        frame = arrays[0]
+        if self.config["main"].get("format") == "YUV420":
+            frame = cv.cvtColor(frame, cv.COLOR_YUV2BGR_I420)
+        else:
+            frame = cv.cvtColor(frame[:, :, :3], cv.COLOR_RGB2BGR)
+        cv.imwrite(filename, frame)
@@ -3,25 +3,26 @@
 # ========================================
 # IMPORTS
 # ========================================
+# tkinter, PIL and picamera2 are imported inside the functions that use
+# them, so importing this module (e.g. for the clothing color helpers)
+# stays fast and works without a camera or display
 import os
 import time
 import threading
-import subprocess
-import tkinter as tk
-from tkinter import ttk
-from tkinter import messagebox
 from datetime import datetime
-from picamera2 import Picamera2
-from picamera2.encoders import H264Encoder
-from PIL import Image, ImageTk
 import cv2
 import numpy as np
-from collections import Counter
+from collections import Counter, deque
+from recorder import Recorder
+from face_detection import FaceDetector, box_iou
 
-print(f"OpenCV: {cv2.__version__}")
-# print(f"Picamera2: {Picamera2.__version__}")
-print(f"np: {np.__version__}")
-print(cv2.__file__)
+
+def print_versions():
+    """Print library versions."""
+    print(f"OpenCV: {cv2.__version__}")
+    # print(f"Picamera2: {Picamera2.__version__}")
+    print(f"np: {np.__version__}")
+    print(cv2.__file__)
 
 # ========================================
 # CONFIGURATION CONSTANTS
@@ -31,8 +32,15 @@ IMAGE_PATH = os.path.join(SAVE_PATH, "images")
 VIDEO_PATH = os.path.join(SAVE_PATH, "videos")
 CAT_ICON_PATH = "/home/raoab/src/ecps205-fp2/tvi/cat_icon.png"
 FACE_CASCADE_PATH = "/home/raoab/fd/haarcascade_frontalface_default.xml"
+FACE_DETECTOR_BACKEND = "haar"  # "haar", "lbp" or "dnn", see face_detection.FaceDetector
+FACE_MODEL_PATH = None          # DNN model file, None = search the usual places
 TEST_VIDEO_PATH = "/home/raoab/fd/face-demographics-walking-and-pause.mp4"
 WINDOW_WIDTH = 1200
+PREVIEW_SIZE = (640, 480)
+RECORD_FPS = 30.0                       # used until the capture rate is measured
+RECORD_SIZE = (1280, 720)               # larger frames are scaled down to fit before queueing
+RECORD_MAX_QUEUE_BYTES = 128 * 1024 * 1024
+PREVIEW_TICK_MS = 15  # Tk only swaps in ready images, so it can poll often
 
 
 # ========================================
@@ -48,6 +56,10 @@ encoder = None
 video_filename = ""
 countdown_label = None
 image_label = None
+stats_label = None
+preview_pump = None
+preview_stats_time = 0.0
+preview_stats_counts = (0, 0)
 
 
 # ========================================
@@ -58,6 +70,7 @@ def initialize_camera():
     global no_camera, picam2, cap
     
     try:
+        from picamera2 import Picamera2
         picam2 = Picamera2()
         picam2.configure(picam2.create_still_configuration())
         print("Picamera2 detected")
@@ -79,6 +92,7 @@ def setup_camera():
 
 def test_camera():
     """Test camera functionality."""
+    from picamera2 import Preview
     picam2.start_preview(Preview.QT)
     picam2.start()
     picam2.title_fields = ["ExposureTime", "AnalogueGain"]
@@ -105,25 +119,28 @@ def ensure_directories():
 # ========================================
 def create_video_window():
     """Creates the video feed window when preview starts."""
-    global video_window, countdown_label, image_label
+    import tkinter as tk
+    global video_window, countdown_label, image_label, stats_label
     
     if video_window is None or not video_window.winfo_exists():
         video_window = tk.Toplevel(root)
         video_window.title("Live Head Swap! Cam")
         video_window.protocol("WM_DELETE_WINDOW", stop_preview)
-        video_window.geometry("650x550")
+        video_window.geometry("650x600")
     
     image_label = tk.Label(video_window)
     image_label.pack()
     
     countdown_label = tk.Label(video_window, text="", font=("Arial", 30, "bold"), fg="red")
     countdown_label.pack(pady=20)
+    
+    stats_label = tk.Label(video_window, text="", font=("Arial", 10))
+    stats_label.pack()
 
 
 def get_frame():
-    """Get frame from camera or video capture."""
+    """Get frame from camera or video capture (camera must be started)."""
     if not no_camera:
-        picam2.start()
         return picam2.capture_array("main")
     else:
         ret, frame = cap.read()
@@ -132,23 +149,133 @@ def get_frame():
         return frame
 
 
+def record_size(width, height, max_size=RECORD_SIZE):
+    """Frame size scaled down (aspect kept, even sides) to fit max_size"""
+    max_w, max_h = max_size
+    if width <= max_w and height <= max_h:
+        return width, height
+    scale = min(max_w / width, max_h / height)
+    return max(2, int(width * scale) & ~1), max(2, int(height * scale) & ~1)
+
+
+class PreviewPump:
+    """
+    Background thread that captures frames and prepares them at display
+    size, so the Tk loop only has to swap in the newest ready image.
+    """
+
+    def __init__(self, size=PREVIEW_SIZE):
+        self.size = size
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.latest = None      # (sequence number, PIL image)
+        self.sequence = 0
+        self.displayed = 0
+        self.dropped = 0
+        self.last_shown = 0
+        self.recorder = None    # gets every frame at record size while recording
+        self.capture_times = deque(maxlen=30)
+
+    def start(self):
+        if not no_camera:
+            picam2.start()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="preview-pump", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+
+    def _run(self):
+        from PIL import Image
+        while not self.stop_event.is_set():
+            try:
+                frame = get_frame()
+            except Exception as e:
+                # e.g. camera being reconfigured for recording
+                print(f"Preview capture error: {e}")
+                time.sleep(0.1)
+                continue
+            if frame is None:
+                time.sleep(0.01)
+                continue
+            self.capture_times.append(time.perf_counter())
+
+            recorder = self.recorder
+            if recorder is not None:
+                # Scale down first, a still configuration delivers full sensor frames
+                record = frame
+                size = record_size(frame.shape[1], frame.shape[0])
+                if size != (frame.shape[1], frame.shape[0]):
+                    record = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                recorder.submit(cv2.cvtColor(record, cv2.COLOR_RGB2BGR))
+
+            # Resize with OpenCV here instead of PIL on the Tk thread
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+            img = Image.fromarray(frame[:, :, :3])
+            with self.lock:
+                self.sequence += 1
+                self.latest = (self.sequence, img)
+
+    def capture_fps(self):
+        """Capture rate over the last frames, None until there are enough"""
+        times = list(self.capture_times)
+        if len(times) < 10 or times[-1] <= times[0]:
+            return None
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def take_latest(self):
+        """Newest prepared image if it was not shown yet, else None."""
+        with self.lock:
+            if self.latest is None or self.latest[0] == self.last_shown:
+                return None
+            sequence, img = self.latest
+            self.dropped += sequence - self.last_shown - 1
+            self.last_shown = sequence
+            self.displayed += 1
+            return img
+
+
 def update_preview():
-    """Continuously updates the Tkinter Label with live preview frames."""
-    if video_window is None or not video_window.winfo_exists():
+    """Swaps the newest prepared frame into the Tkinter Label."""
+    global preview_stats_time, preview_stats_counts
+    from PIL import ImageTk
+    if video_window is None or not video_window.winfo_exists() or preview_pump is None:
         return
     
-    frame = get_frame()
-    img = Image.fromarray(frame).resize((640, 480))
-    tk_img = ImageTk.PhotoImage(img)
-    image_label.config(image=tk_img)
-    image_label.image = tk_img
-    video_window.after(50, update_preview)
+    img = preview_pump.take_latest()
+    if img is not None:
+        tk_img = ImageTk.PhotoImage(img)
+        image_label.config(image=tk_img)
+        image_label.image = tk_img
+    
+    # Report displayed and dropped frame rates once a second
+    now = time.time()
+    elapsed = now - preview_stats_time
+    if elapsed >= 1.0:
+        displayed, dropped = preview_stats_counts
+        shown_fps = (preview_pump.displayed - displayed) / elapsed
+        dropped_fps = (preview_pump.dropped - dropped) / elapsed
+        stats_label.config(text=f"Preview: {shown_fps:.1f} fps shown, {dropped_fps:.1f} fps dropped")
+        preview_stats_time = now
+        preview_stats_counts = (preview_pump.displayed, preview_pump.dropped)
+    
+    video_window.after(PREVIEW_TICK_MS, update_preview)
 
 
 def start_preview():
     """Starts live preview and opens video feed window."""
+    global preview_pump, preview_stats_time, preview_stats_counts
     create_video_window()
     try:
+        if preview_pump is None:
+            preview_pump = PreviewPump()
+            preview_pump.start()
+        preview_stats_time = time.time()
+        preview_stats_counts = (preview_pump.displayed, preview_pump.dropped)
         update_preview()
     except Exception as e:
         print(f"Error starting preview: {e}")
@@ -156,7 +283,13 @@ def start_preview():
 
 def stop_preview():
     """Stops live preview and closes video feed window."""
+    global preview_pump
+    if recording:
+        stop_recording()
     try:
+        if preview_pump is not None:
+            preview_pump.stop()
+            preview_pump = None
         if video_window:
             video_window.destroy()
             if not no_camera:
@@ -189,6 +322,7 @@ def capture_image():
 # ========================================
 def start_recording():
     """Starts the countdown timer before recording."""
+    from tkinter import messagebox
     print("DEBUG: start_recording() called")
     
     if video_window is None or not video_window.winfo_exists():
@@ -205,6 +339,7 @@ def start_recording():
 
 def show_countdown_timer(count):
     """Updates the countdown timer below the video feed."""
+    import tkinter as tk
     print(f"DEBUG: show_countdown_timer called with count={count}")
     
     print(f"DEBUG: video_window is None? {video_window is None}")
@@ -237,7 +372,7 @@ def show_countdown_timer(count):
 
 
 def start_recording_after_countdown():
-    """Starts recording video after countdown finishes."""
+    """Starts recording the preview stream after countdown finishes."""
     print("DEBUG: start_recording_after_countdown() called")
     
     if no_camera:
@@ -249,52 +384,47 @@ def start_recording_after_countdown():
         print("Already recording...")
         return
     
-    video_filename = os.path.join(VIDEO_PATH, f"video_{get_timestamp()}.h264")
-    encoder = H264Encoder()
+    if preview_pump is None:
+        print("Please start camera first before recording!")
+        return
+    
+    # Frames come from the running preview pump, the camera keeps its
+    # configuration so the live preview does not pause
+    video_filename = os.path.join(VIDEO_PATH, f"video_{get_timestamp()}.mp4")
     try:
         print(f"Recording video: {video_filename}")
+        # Record at the rate frames actually arrive, not a nominal one,
+        # so the video plays back at real speed
+        fps = preview_pump.capture_fps() or RECORD_FPS
+        print(f"Recording at {fps:.1f} fps")
+        encoder = Recorder(video_filename, fps=fps, max_bytes=RECORD_MAX_QUEUE_BYTES)
+        encoder.start()
+        preview_pump.recorder = encoder
         recording = True
-        picam2.stop()
-        picam2.configure(picam2.create_video_configuration())
-        picam2.start()
-        picam2.start_recording(encoder, video_filename)
         print("DEBUG: Recording started successfully")
     except Exception as e:
         print(f"Error starting recording: {e}")
 
 
 def stop_recording():
-    """Stops recording and converts to MP4 without freezing."""
+    """Stops recording without freezing."""
     global recording, encoder, video_filename
     if not recording:
         print("Not currently recording...")
         return
     
+    if preview_pump is not None:
+        preview_pump.recorder = None
+    recorder = encoder
+    recording = False
+    encoder = None
+    
     def _stop():
-        global recording, encoder, video_filename
         try:
             print("Stopping recording...")
-            picam2.stop_recording()
-            picam2.stop()
-            picam2.configure(picam2.create_still_configuration())
-            picam2.start()
-            recording = False
-            encoder = None
-            
-            if video_filename:
-                mp4_filename = video_filename.replace(".h264", ".mp4")
-                
-                def convert_to_mp4():
-                    try:
-                        print(f"Converting {video_filename} to {mp4_filename}...")
-                        subprocess.run(["ffmpeg", "-i", video_filename, "-c:v", "copy",
-                                      "-movflags", "+faststart", mp4_filename], check=True)
-                        os.remove(video_filename)
-                        print(f"Conversion complete! Saved as: {mp4_filename}")
-                    except Exception as e:
-                        print(f"Error converting video: {e}")
-                
-                threading.Thread(target=convert_to_mp4, daemon=True).start()
+            # Encodes what is still queued, then closes the MP4
+            stats = recorder.stop()
+            print(f"Recording stats: {stats}")
         except Exception as e:
             print(f"Error stopping recording: {e}")
     
@@ -354,6 +484,146 @@ def get_dominant_color_kmeans(frame, k=3):
 
     return dominant_color.astype(int)
 
+# packed histogram - same idea as get_dominant_color_simple without python tuples
+def get_dominant_color_hist(frame, bits=5):
+    """
+    Returns the dominant color using a quantized color histogram.
+
+    Parameters:
+        frame (np.ndarray): Input pixels (... x 3), uint8.
+        bits (int): Bits kept per channel. 8 counts exact colors and gives
+            the same answer as get_dominant_color_simple (ties included),
+            fewer bits merge similar shades.
+
+    Returns:
+        np.ndarray: Mean BGR color of the most common bin as integers.
+    """
+    pixels = frame.reshape(-1, 3)
+    if pixels.shape[0] == 0:
+        return np.zeros(3, dtype=int)
+
+    # Pack the quantized channels into one integer per pixel
+    shift = 8 - bits
+    q = pixels.astype(np.int32) >> shift
+    packed = (q[:, 0] << (2 * bits)) | (q[:, 1] << bits) | q[:, 2]
+
+    counts = np.bincount(packed, minlength=1 << (3 * bits))
+    # Ties go to the bin seen first, like Counter.most_common
+    first = np.flatnonzero(counts[packed] == counts.max())[0]
+    best = packed[first]
+
+    # Mean of the pixels in the winning bin, not the bin corner
+    return pixels[packed == best].mean(axis=0).astype(int)
+
+
+class WarmKMeans:
+    """
+    K-means dominant color that starts from the previous call's centers.
+    Keep one instance per face so consecutive frames of the same person
+    need a single short k-means run instead of 10 random restarts.
+    """
+
+    def __init__(self, k=3, max_iter=10, eps=1.0):
+        self.k = k
+        self.criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_MAX_ITER, max_iter, eps)
+        self.centers = None
+
+    def reset(self):
+        self.centers = None
+
+    def __call__(self, frame):
+        pixels = frame.reshape(-1, 3).astype(np.float32)
+        if pixels.shape[0] < self.k:
+            return get_dominant_color_hist(frame, bits=8)
+
+        if self.centers is None:
+            labels = None
+            flags = cv2.KMEANS_PP_CENTERS
+        else:
+            # Label every pixel with its nearest previous center
+            distances = ((pixels[:, None, :] - self.centers[None, :, :]) ** 2).sum(axis=2)
+            labels = distances.argmin(axis=1).astype(np.int32).reshape(-1, 1)
+            flags = cv2.KMEANS_USE_INITIAL_LABELS
+
+        _, labels, centers = cv2.kmeans(
+            data=pixels,
+            K=self.k,
+            bestLabels=labels,
+            criteria=self.criteria,
+            attempts=1,
+            flags=flags,
+        )
+        self.centers = centers
+
+        counts = np.bincount(labels.flatten(), minlength=self.k)
+        return centers[counts.argmax()].astype(int)
+
+
+# selects how start_head_swap estimates clothing color: "kmeans", "kmeans_warm" or "hist"
+DOMINANT_COLOR_MODE = "kmeans"
+
+
+def get_dominant_color(frame, mode=None, warm_kmeans=None):
+    """
+    Returns the dominant color with the selected estimator.
+
+    mode=None uses DOMINANT_COLOR_MODE as it is at call time. "kmeans_warm"
+    needs the WarmKMeans of the person the pixels belong to, a fresh one
+    per call would never be warm.
+    """
+    if mode is None:
+        mode = DOMINANT_COLOR_MODE
+    if mode == "hist":
+        return get_dominant_color_hist(frame)
+    if mode == "kmeans_warm":
+        if warm_kmeans is None:
+            raise ValueError('mode "kmeans_warm" needs the WarmKMeans of this person (warm_kmeans=...)')
+        return warm_kmeans(frame)
+    return get_dominant_color_kmeans(frame, k=3)
+
+
+def compare_dominant_color_modes(frames, k=3):
+    """
+    Compare the fast estimators against get_dominant_color_kmeans.
+
+    Parameters:
+        frames (list): Pixel arrays of the same person over consecutive frames.
+
+    Returns:
+        dict: mode -> {"ms": mean time per call,
+                       "mean_error" / "max_error": BGR distance to the k-means answer}
+    """
+    estimators = {
+        "kmeans": lambda f: get_dominant_color_kmeans(f, k=k),
+        "kmeans_warm": WarmKMeans(k=k),
+        "hist": get_dominant_color_hist,
+        "hist8": lambda f: get_dominant_color_hist(f, bits=8),
+    }
+    times = {mode: 0.0 for mode in estimators}
+    errors = {mode: [] for mode in estimators}
+
+    for frame in frames:
+        results = {}
+        for mode, estimate in estimators.items():
+            start = time.perf_counter()
+            results[mode] = estimate(frame)
+            times[mode] += time.perf_counter() - start
+
+        reference = results["kmeans"].astype(float)
+        for mode, color in results.items():
+            errors[mode].append(float(np.linalg.norm(color.astype(float) - reference)))
+
+    report = {}
+    for mode in estimators:
+        report[mode] = {
+            "ms": times[mode] * 1000.0 / max(1, len(frames)),
+            "mean_error": float(np.mean(errors[mode])) if errors[mode] else 0.0,
+            "max_error": float(np.max(errors[mode])) if errors[mode] else 0.0,
+        }
+        print(f"{mode:<12} {report[mode]['ms']:8.2f} ms  "
+              f"error mean {report[mode]['mean_error']:6.1f} max {report[mode]['max_error']:6.1f}")
+    return report
+
 # portions from https://stackoverflow.com/questions/55691212/extract-upper-body-from-face-detection-opencv-python
 
 def get_upper_body_region(frame, face_rect):
@@ -414,6 +684,25 @@ def is_skin_color(pixel_bgr):
 # Proceedings of the 2nd International Conference on Automatic Face and Gesture Recognition
 # portions from https://stackoverflow.com/questions/61241113/detect-skin-color-in-an-image-using-opencv-python
 
+def skin_mask(pixels_bgr):
+    """
+    Vectorized is_skin_color: boolean mask over the last axis of a
+    BGR array of any shape (..., 3), same rules as is_skin_color.
+    """
+    # int16 so the channel differences cannot wrap around
+    pixels = pixels_bgr.astype(np.int16)
+    b = pixels[..., 0]
+    g = pixels[..., 1]
+    r = pixels[..., 2]
+
+    return (
+        (r > 95) & (g > 40) & (b > 20) &
+        ((pixels.max(axis=-1) - pixels.min(axis=-1)) > 15) &
+        (np.abs(r - g) > 15) &
+        (r > g) & (r > b)
+    )
+
+
 def filter_skin_pixels(region):
     """
     Returns all pixels in the region that are *not* classified as skin.
@@ -421,22 +710,181 @@ def filter_skin_pixels(region):
     """
     pixels = region.reshape(-1, 3)
 
-    # Build a mask that keeps only non-skin pixels
-    mask = []
-    for pixel in pixels:
-        mask.append(not is_skin_color(pixel))
-
-    mask = np.array(mask)
-    filtered = pixels[mask]
+    # Keep only non-skin pixels
+    filtered = pixels[~skin_mask(pixels)]
 
     return filtered
 
 
+def get_clothing_pixels_batch(frame, faces):
+    """
+    Upper body regions and their non-skin pixels for all faces of a frame.
+    The skin mask is computed once over the area covering every region,
+    so overlapping regions are not classified twice.
+
+    Returns:
+        List of (region, (x, y, w, h), filtered_pixels), one per face
+    """
+    regions = [get_upper_body_region(frame, face) for face in faces]
+    boxes = [coords for region, coords in regions if region.size > 0]
+    if not boxes:
+        return [(region, coords, region.reshape(-1, 3)[:0]) for region, coords in regions]
+
+    # Bounding box of all regions
+    left = min(x for x, y, w, h in boxes)
+    top = min(y for x, y, w, h in boxes)
+    right = max(x + w for x, y, w, h in boxes)
+    bottom = max(y + h for x, y, w, h in boxes)
+    not_skin = ~skin_mask(frame[top:bottom, left:right])
+
+    results = []
+    for region, (x, y, w, h) in regions:
+        if region.size == 0:
+            filtered = region.reshape(-1, 3)[:0]
+        else:
+            keep = not_skin[y - top:y - top + h, x - left:x - left + w]
+            filtered = region[keep]
+        results.append((region, (x, y, w, h), filtered))
+
+    return results
+
+
+# how often a cached clothing color is recomputed, and how far the region may move before that
+CLOTHING_REFRESH_FRAMES = 30
+CLOTHING_CHANGE_IOU = 0.5
+
+
+class ClothingColorCache:
+    """
+    Dominant clothing color per face track, so a person's shirt is only
+    analysed every refresh_interval frames or when their upper body
+    region moves or resizes (region IoU below change_iou).
+
+    Pass track_ids from a FaceTracker, or leave them out and faces are
+    matched to the previous frame's tracks by box IoU. Tracks unseen for
+    more than max_missed frames are evicted.
+    """
+
+    def __init__(self, refresh_interval=CLOTHING_REFRESH_FRAMES, change_iou=CLOTHING_CHANGE_IOU,
+                 iou_threshold=0.3, max_missed=5, mode=None):
+        self.refresh_interval = refresh_interval
+        self.change_iou = change_iou
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.mode = mode if mode is not None else DOMINANT_COLOR_MODE
+        self.tracks = {}    # id -> {'box', 'region', 'color', 'filtered', 'frame', 'missed', 'warm'}
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _match(self, faces):
+        """Track ID for each face by greedy IoU matching with the known tracks"""
+        pairs = []
+        for tid, track in self.tracks.items():
+            for i, face in enumerate(faces):
+                iou = box_iou(track['box'], face)
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, tid, i))
+        pairs.sort(reverse=True)
+
+        ids = [None] * len(faces)
+        used = set()
+        for _, tid, i in pairs:
+            if tid in used or ids[i] is not None:
+                continue
+            ids[i] = tid
+            used.add(tid)
+        for i in range(len(faces)):
+            if ids[i] is None:
+                ids[i] = self.next_id
+                self.next_id += 1
+        return ids
+
+    def lookup(self, frame, faces, frame_index, track_ids=None):
+        """
+        Clothing color of every face, recomputing only stale entries
+
+        Returns:
+            List of (upper_body_region, region_coords, dominant_color, filtered, cached),
+            one per face. dominant_color is None when the region is empty,
+            filtered is False when no non-skin pixels were found.
+        """
+        faces = [tuple(int(v) for v in face) for face in faces]
+        if track_ids is None:
+            track_ids = self._match(faces)
+
+        regions = [get_upper_body_region(frame, face) for face in faces]
+        stale = []
+        for i, tid in enumerate(track_ids):
+            track = self.tracks.get(tid)
+            region, coords = regions[i]
+            if (track is None or track['color'] is None
+                    or frame_index - track['frame'] >= self.refresh_interval
+                    or box_iou(track['region'], coords) < self.change_iou):
+                stale.append(i)
+
+        # Skin filtering and k-means only for the faces that need it
+        if stale:
+            clothing = get_clothing_pixels_batch(frame, [faces[i] for i in stale])
+            for i, (region, coords, filtered_pixels) in zip(stale, clothing):
+                tid = track_ids[i]
+                track = self.tracks.get(tid)
+                if track is None:
+                    track = {'warm': WarmKMeans() if self.mode == "kmeans_warm" else None}
+                    self.tracks[tid] = track
+                if region.size == 0:
+                    color, filtered = None, False
+                elif filtered_pixels.size > 0:
+                    color = get_dominant_color(filtered_pixels.reshape(-1, 1, 3), self.mode, track['warm'])
+                    filtered = True
+                else:
+                    color = get_dominant_color(region, self.mode, track['warm'])
+                    filtered = False
+                track.update({'region': coords, 'color': color, 'filtered': filtered,
+                              'frame': frame_index})
+        self.misses += len(stale)
+        self.hits += len(faces) - len(stale)
+
+        seen = set(track_ids)
+        for i, tid in enumerate(track_ids):
+            self.tracks[tid]['box'] = faces[i]
+            self.tracks[tid]['missed'] = 0
+
+        # Forget people who left
+        for tid in list(self.tracks):
+            if tid not in seen:
+                self.tracks[tid]['missed'] += 1
+                if self.tracks[tid]['missed'] > self.max_missed:
+                    del self.tracks[tid]
+                    self.evictions += 1
+
+        stale = set(stale)
+        results = []
+        for i, tid in enumerate(track_ids):
+            track = self.tracks[tid]
+            region, coords = regions[i]
+            results.append((region, coords, track['color'], track['filtered'], i not in stale))
+        return results
+
+    def get_stats(self):
+        """Get hit rate and number of tracks"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total > 0 else 0.0,
+            'tracks': len(self.tracks),
+            'evictions': self.evictions,
+        }
+
+
 # ========================================
 # HEAD SWAP FUNCTIONS
 # ========================================
 def select_cat_faces():
     """Launches the cat face selection script."""
+    from tkinter import messagebox
     try:
         messagebox.showerror("Error", "cat face selection not implemented!")
     except Exception as e:
@@ -445,6 +893,7 @@ def select_cat_faces():
 
 def hs_settings():
     """Launches the Head Swap! settings script."""
+    from tkinter import messagebox
     try:
         messagebox.showerror("Error", "hs_settings not implemented!")
     except Exception as e:
@@ -453,10 +902,16 @@ def hs_settings():
 
 def start_head_swap():
     """Starts the Head Swap! process."""
-    face_cascade = cv2.CascadeClassifier(FACE_CASCADE_PATH)
-    
-    if face_cascade.empty():
-        print("ERROR: Failed to load cascade classifier!")
+    # the configured cascade file is only used by the Haar backend,
+    # otherwise (or if it is missing) FaceDetector searches the usual places
+    cascade_path = None
+    if FACE_DETECTOR_BACKEND == "haar" and os.path.exists(FACE_CASCADE_PATH):
+        cascade_path = FACE_CASCADE_PATH
+    try:
+        face_detector = FaceDetector(cascade_path, backend=FACE_DETECTOR_BACKEND,
+                                     model_path=FACE_MODEL_PATH)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"ERROR: Failed to load {FACE_DETECTOR_BACKEND} face detector: {e}")
         return
     
     if no_camera:
@@ -469,6 +924,7 @@ def start_head_swap():
         return
     
     frame_count = 0
+    clothing_cache = ClothingColorCache()
     
     while True:
         ret, frame = cap.read()
@@ -481,39 +937,42 @@ def start_head_swap():
         if frame_count == 1:
             print(f"Frame dimensions: {frame.shape}")
         
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        if frame_count == 1:
-            print(f"Gray frame dimensions: {gray.shape} Gray frame dtype: {gray.dtype}")
+        # the detector converts to grayscale itself when its backend needs it
+        faces = face_detector.detect_faces(frame, scale_factor=1.3, min_neighbors=5, min_size=(0, 0))
         
-        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5)
+        # clothing colors come from the per-track cache, only stale tracks
+        # get their upper body skin filtered and clustered (also without
+        # faces, so tracks age out). This deliberately happens before any
+        # box is drawn: the old loop drew each face box first, so the box
+        # edges leaked into that face's and later faces' clothing pixels
+        # and the colors depended on face order.
+        clothing = clothing_cache.lookup(frame, faces, frame_count)
         
         if len(faces) > 0:
             print(f"Frame {frame_count}: Detected {len(faces)} face(s)")
             
+            boxes_to_draw = []
+            
             for i, (x, y, w, h) in enumerate(faces):
                 print(f"   Face {i+1}: x={x}, y={y}, w={w}, h={h}")
-                cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
+                boxes_to_draw.append(((x, y, w, h), (255, 0, 0)))
                 
-                # hack the upper body region for dominant clothing color
-                upper_body_region, region_coords = get_upper_body_region(frame, (x, y, w, h))
+                upper_body_region, region_coords, dominant_color, filtered, cached = clothing[i]
                 if upper_body_region.size == 0:
                     print(f"   Face {i+1}: Upper body region is empty")
                     return None
-    
-                # Filter out skin pixels
-                filtered_pixels = filter_skin_pixels(upper_body_region)
-                if filtered_pixels.size > 0:
-                    dominant_color = get_dominant_color_kmeans(filtered_pixels.reshape(-1, 1, 3), k=3)
-                    print(f"   Face {i+1}: Dominant clothing color: {dominant_color}")
-                    x2, y2, w2, h2 = region_coords
-                    cv2.rectangle(frame, (x2, y2), (x2+w2, y2+h2), (0, 255, 0), 2)
+                
+                source = " (cached)" if cached else ""
+                if filtered:
+                    print(f"   Face {i+1}: Dominant clothing color: {dominant_color}{source}")
+                    boxes_to_draw.append((region_coords, (0, 255, 0)))
                 else:
                     print(f"   Face {i+1}: No non-skin pixels found in upper body region")  
-                    dominant_color = get_dominant_color_kmeans(upper_body_region, k=3)
-                    print(f"   Face {i+1}: Dominant clothing color (unfiltered): {dominant_color}") 
-                    x2, y2, w2, h2 = region_coords
-                    cv2.rectangle(frame, (x2, y2), (x2+w2, y2+h2), (128, 0, 255), 2)
+                    print(f"   Face {i+1}: Dominant clothing color (unfiltered): {dominant_color}{source}") 
+                    boxes_to_draw.append((region_coords, (128, 0, 255)))
+            
+            for (x2, y2, w2, h2), color in boxes_to_draw:
+                cv2.rectangle(frame, (x2, y2), (x2+w2, y2+h2), color, 2)
                     
         else:
             if frame_count % 30 == 0:
@@ -526,11 +985,15 @@ def start_head_swap():
     
     cap.release()
     cv2.destroyAllWindows()
+    stats = clothing_cache.get_stats()
+    print(f"Clothing color cache: {stats['hit_rate']*100:.1f}% hits "
+          f"({stats['hits']} hits, {stats['misses']} recomputed, {stats['evictions']} evicted)")
     print("\nCleanup complete")
 
 
 def stop_head_swap():
     """Stops the Head Swap! process."""
+    from tkinter import messagebox
     try:
         messagebox.showerror("Error", "stop_head_swap not implemented!")
     except Exception as e:
@@ -542,6 +1005,8 @@ def stop_head_swap():
 # ========================================
 def initialize_gui():
     """Initialize the main Tkinter GUI."""
+    import tkinter as tk
+    from tkinter import ttk
     global root
     
     root = tk.Tk()
@@ -555,6 +1020,8 @@ def initialize_gui():
 
 def create_buttons():
     """Create all GUI buttons."""
+    import tkinter as tk
+    from PIL import Image, ImageTk
     buttons_frame = tk.Frame(root)
     buttons_frame.pack(pady=10)
     
@@ -624,16 +1091,20 @@ def setup_window_close_handler():
 # ========================================
 def main():
     """Main entry point of the application."""
+    print_versions()
+    
     # Step 1: Ensure directories exist
     ensure_directories()
     
-    # Step 2: Initialize camera
-    initialize_camera()
+    # Step 2: Initialize camera (in the background, Tk must stay on this thread)
+    camera_thread = threading.Thread(target=initialize_camera, daemon=True)
+    camera_thread.start()
     
     # Step 3: Initialize GUI
     initialize_gui()
     
-    # Step 4: Create buttons
+    # Step 4: Create buttons (they depend on whether a camera was found)
+    camera_thread.join()
     create_buttons()
     
     # Step 5: Setup window close handler
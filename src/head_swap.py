@@ -1,83 +1,170 @@
-
 import cv2 as cv
 import numpy as np
-from cat import cat_paste
+from collections import OrderedDict
+from cat import prepare_cat, cat_blend
+
+
+class SpriteCache:
+    def __init__(self, max_bytes=32 * 1024 * 1024, size_step=8, interpolation=cv.INTER_AREA):
+        """
+        LRU cache of resized, blend-ready cat sprites
+
+        Haar boxes jitter around a handful of sizes, so target sizes are
+        rounded to the nearest size_step pixels and reused between frames.
+        Entries are stored already split by prepare_cat. interpolation is
+        the resize filter and part of the key, so it can change at runtime.
+        """
+        self.max_bytes = max_bytes
+        self.size_step = size_step
+        self.interpolation = interpolation
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, size):
+        """Round a target size to the nearest bucket (never below one step)"""
+        step = self.size_step
+        return max(step, int(round(size / step)) * step)
+
+    def get(self, cat_faces, cat_idx, w, h, scale_factor):
+        """
+        Get cat sprite resized for a w x h face box
+
+        Returns:
+            (premul, inv_alpha) tuple of the quantized scaled size
+        """
+        new_w = self.quantize(w * scale_factor)
+        new_h = self.quantize(h * scale_factor)
+        interpolation = self.interpolation
+        key = (cat_idx, new_w, new_h, scale_factor, interpolation)
+
+        sprite = self.entries.get(key)
+        if sprite is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return sprite
+
+        self.misses += 1
+        resized = cv.resize(cat_faces[cat_idx], (new_w, new_h), interpolation=interpolation)
+        sprite = prepare_cat(resized)
+        nbytes = self._nbytes(sprite)
+
+        # Sprites bigger than the whole budget are used but never stored
+        if nbytes <= self.max_bytes:
+            self.entries[key] = sprite
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.current_bytes -= self._nbytes(evicted)
+
+        return sprite
+
+    @staticmethod
+    def _nbytes(sprite):
+        return sum(part.nbytes for part in sprite)
+
+    def clear(self):
+        """Drop all cached sprites (counters are kept)"""
+        self.entries.clear()
+        self.current_bytes = 0
+
+    def get_stats(self):
+        """Get hit/miss counters and memory usage"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total > 0 else 0.0,
+            'entries': len(self.entries),
+            'bytes': self.current_bytes,
+        }
 
 
 class HeadSwapper:
-    def __init__(self, cat_faces, scale_factor=1.3):
+    def __init__(self, cat_faces, scale_factor=1.3, cache_bytes=32 * 1024 * 1024):
         """
         Initialize head swapper
         """
         self.cat_faces = cat_faces
         self.scale_factor = scale_factor # We scale the sprite to match human face
         self.current_cat_set = 0
+        self.sprite_cache = SpriteCache(max_bytes=cache_bytes)
         
         print(f"HeadSwapper initialized with {len(cat_faces)} cat faces")
     
-    def swap_heads(self, frame, faces):
+    def _paste_cat(self, frame, cat_idx, x, y, w, h):
+        """Resize (through the sprite cache) and paste one cat centered on a face"""
+        cat_prepared = self.sprite_cache.get(self.cat_faces, cat_idx, w, h, self.scale_factor)
+        new_h, new_w = cat_prepared[0].shape[:2]
+        
+        # Center the cat over the detected face
+        offset_x = x - (new_w - w) // 2
+        offset_y = y - (new_h - h) // 2
+        
+        # Paste the cat head with transparency
+        return cat_blend(frame, cat_prepared, offset_x, offset_y)
+    
+    def _composite(self, frame, faces, cat_indices):
+        """
+        Paste all cats, back to front
+        
+        Larger faces are usually closer to the camera, so they are drawn
+        last and end up on top where cats overlap.
+        """
+        order = sorted(range(len(faces)), key=lambda i: faces[i][2] * faces[i][3])
+        for i in order:
+            frame = self._paste_cat(frame, cat_indices[i], *faces[i])
+        return frame
+    
+    def swap_heads(self, frame, faces, track_ids=None):
         """
         Replace detected faces with cat heads
+
+        With track_ids (from FaceTracker) each person keeps the same cat,
+        otherwise cats are picked by list position.
         """
-        for idx, (x, y, w, h) in enumerate(faces):
+        cat_indices = []
+        for idx in range(len(faces)):
             # Select which cat to use
-            cat_idx = (idx + self.current_cat_set) % len(self.cat_faces)
-            cat = self.cat_faces[cat_idx]
-            
-            # Calculate new size with scale factor
-            new_w = int(w * self.scale_factor)
-            new_h = int(h * self.scale_factor)
-            
-            # Resize cat to fit the face
-            cat_resized = cv.resize(cat, (new_w, new_h), interpolation=cv.INTER_AREA)
-            
-            # Center the cat over the detected face
-            offset_x = x - (new_w - w) // 2
-            offset_y = y - (new_h - h) // 2
-            
-            # Paste the cat head with transparency
-            frame = cat_paste(frame, cat_resized, offset_x, offset_y)
+            key = track_ids[idx] if track_ids is not None else idx
+            cat_indices.append((key + self.current_cat_set) % len(self.cat_faces))
         
-        return frame
+        return self._composite(frame, faces, cat_indices)
     
     def swap_heads_custom(self, frame, faces, cat_indices=None):
         """
         Replace faces with specific cat selections
         """
-        for idx, (x, y, w, h) in enumerate(faces):
+        selected = []
+        for idx in range(len(faces)):
             # Select cat
             if cat_indices and idx < len(cat_indices):
-                cat_idx = cat_indices[idx] % len(self.cat_faces)
+                selected.append(cat_indices[idx] % len(self.cat_faces))
             else:
-                cat_idx = (idx + self.current_cat_set) % len(self.cat_faces)
-            
-            cat = self.cat_faces[cat_idx]
-            
-            # Calculate new size
-            new_w = int(w * self.scale_factor)
-            new_h = int(h * self.scale_factor)
-            
-            # Resize cat
-            cat_resized = cv.resize(cat, (new_w, new_h), interpolation=cv.INTER_AREA)
-            
-            # Center placement
-            offset_x = x - (new_w - w) // 2
-            offset_y = y - (new_h - h) // 2
-            
-            # Paste cat
-            frame = cat_paste(frame, cat_resized, offset_x, offset_y)
+                selected.append((idx + self.current_cat_set) % len(self.cat_faces))
         
-        return frame
+        return self._composite(frame, faces, selected)
     
     def change_cat_set(self):
         """Cycle to next cat set"""
         self.current_cat_set = (self.current_cat_set + 1) % len(self.cat_faces)
+        self.sprite_cache.clear()
         return self.current_cat_set
     
     def set_scale_factor(self, scale):
         
         if 0.5 <= scale <= 3.0:
             self.scale_factor = scale
+            self.sprite_cache.clear()
             print(f"Scale factor set to {scale}")
         else:
             print(f"Warning: Scale {scale} out of range (0.5-3.0)")
+
+    def set_interpolation(self, interpolation):
+        """Resize filter for new sprites (cv.INTER_*), cached ones age out"""
+        self.sprite_cache.interpolation = interpolation
+
+    def get_cache_stats(self):
+        """Get sprite cache hit/miss counters"""
+        return self.sprite_cache.get_stats()
@@ -0,0 +1,51 @@
+import cv2 as cv
+import numpy as np
+from cat import cat_blend
+
+
+class HudLayer:
+    def __init__(self, height=180, darken=0.4, enabled=True):
+        """
+        Pre-rendered info panel drawn over the top of the frame
+
+        The panel (the frame darkened to `darken` with text on top) is
+        kept as a blend-ready layer for cat_blend and only re-rendered
+        when the text changes, so a frame costs one in-place blend.
+        """
+        self.height = height
+        self.darken = darken
+        self.enabled = enabled
+        self.key = None
+        self.layer = None
+        self.renders = 0
+
+    def _render(self, width, lines):
+        """Build (premul, inv_alpha) for the panel with the given text lines"""
+        text = np.zeros((self.height, width, 3), dtype=np.uint8)
+        mask = np.zeros((self.height, width), dtype=np.uint8)
+        for (string, org, scale, color, thickness) in lines:
+            cv.putText(text, string, org, cv.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+            cv.putText(mask, string, org, cv.FONT_HERSHEY_SIMPLEX, scale, 255, thickness)
+
+        # Background keeps `darken` of the frame, text pixels replace it
+        inv_alpha = np.full((self.height, width, 3), int(round(self.darken * 255)), dtype=np.uint8)
+        inv_alpha[mask > 0] = 0
+        self.renders += 1
+        return text, inv_alpha
+
+    def draw(self, frame, lines):
+        """
+        Draw the panel onto frame in place
+
+        lines: list of (text, (x, y), font scale, BGR color, thickness)
+        """
+        if not self.enabled:
+            return frame
+
+        width = frame.shape[1]
+        key = (width, tuple(lines))
+        if key != self.key:
+            self.layer = self._render(width, lines)
+            self.key = key
+
+        return cat_blend(frame, self.layer, 0, 0)
@@ -1,17 +1,80 @@
 #2025/11/15 ECPS205 Final Project... KEVIN_LEE
+import time
+
+# Reference point for the time-to-first-frame report
+PROCESS_START = time.perf_counter()
 
+from concurrent.futures import ThreadPoolExecutor
 from cam import CameraController
 from cat import load_all_cats
-from face_detection import FaceDetector
+from face_detection import FaceDetector, FaceTracker, RoiFaceDetector
 from head_swap import HeadSwapper
+from pipeline import Pipeline
+from metrics import FrameMetrics, CsvExporter, PrometheusExporter
+from hud import HudLayer
+from recorder import Recorder
+from quality import QualityController
 import cv2 as cv
-import time
 import os
 
 
 # Output directory for saved images
 OUTPUT_DIR = "outputs"
 
+# Camera pixel format: YUV420 lets detection use the luma plane without conversion
+CAMERA_FORMAT = "YUV420"
+
+# Output (main) stream size, and a small lores stream for detection (None = detect on main)
+CAMERA_SIZE = (1280, 720)
+CAMERA_LORES_SIZE = (640, 360)
+
+# Frame buffers the camera cycles through (None = Picamera2 default)
+CAMERA_BUFFER_COUNT = 4
+
+# Face detector backend: "haar", "lbp" (faster) or "dnn" (needs the YuNet model file)
+DETECTOR_BACKEND = "haar"
+DETECTOR_MODEL = None
+
+# Full face detection every N frames, optical flow tracking in between
+DETECT_INTERVAL = 5
+
+# Run the cascade at this fraction of the detection image (lores, or main without lores)
+DETECT_SCALE = 1.0 if CAMERA_LORES_SIZE else 0.5
+
+# Split detection over (cols, rows) overlapping tiles on a thread pool (None = one call)
+DETECT_TILES = None
+
+# Full frame cascade sweep every N detections, otherwise only around known faces
+FULL_SWEEP_INTERVAL = 10
+
+# Frame rate written into recordings when the live rate is not known yet
+RECORD_FPS = 20.0
+
+# Adaptive quality holds this frame time by trading detection and sprite
+# quality between the QUALITY_BEST and QUALITY_WORST bounds (None = fixed, toggle with [A])
+TARGET_FRAME_MS = 50.0
+# Detection runs on its own thread, so it is held to its own latency budget
+# (p95 of the detect stage, i.e. how old the boxes get; None = frame time only)
+TARGET_DETECT_MS = 100.0
+QUALITY_BEST = {'scale_factor': 1.1, 'min_neighbors': 5, 'min_size': 50,
+                'detect_scale': DETECT_SCALE, 'detect_interval': DETECT_INTERVAL}
+QUALITY_WORST = {'scale_factor': 1.3, 'min_neighbors': 4, 'min_size': 90,
+                 'detect_scale': DETECT_SCALE / 2, 'detect_interval': 12}
+
+# Performance mode starts with the info panel off (toggle with [P])
+PERFORMANCE_MODE = False
+
+# Seconds between updates of the FPS/latency line in the info panel
+HUD_METRICS_REFRESH = 0.5
+
+# Rolling stage timings are appended here every METRICS_CSV_INTERVAL seconds
+METRICS_CSV = os.path.join(OUTPUT_DIR, "metrics.csv")
+METRICS_CSV_INTERVAL = 10.0
+
+# Port for a Prometheus-text /metrics endpoint (None = off)
+METRICS_PORT = None
+METRICS_HOST = "127.0.0.1"
+
 
 def create_output_dir():
     """Create outputs directory if it doesn't exist"""
@@ -20,76 +83,121 @@ def create_output_dir():
         print(f"Created output directory: {OUTPUT_DIR}")
 
 
+def start_camera():
+    """Create the camera and let it warm up"""
+    cam0 = CameraController(0, False, pixel_format=CAMERA_FORMAT, size=CAMERA_SIZE,
+                            lores_size=CAMERA_LORES_SIZE, buffer_count=CAMERA_BUFFER_COUNT)
+    cam0.start_preview()
+    return cam0
+
+
+def apply_quality(settings, pipeline, face_tracker, head_swapper):
+    """Push QualityController settings into the running pipeline"""
+    pipeline.set_detect_kwargs(**settings['detect_kwargs'])
+    face_tracker.detect_interval = settings['detect_interval']
+    head_swapper.set_interpolation(settings['interpolation'])
+
+
 def main():
     # Create output directory
     create_output_dir()
     
     print("\nInitializing components...")
     
-    # Initialize camera
-    print("\n1. Starting camera...")
-    cam0 = CameraController(0, False)
-    cam0.start_preview()
+    # Camera warm-up, sprite loading and cascade loading run concurrently
+    print("\n1. Starting camera, loading cat sprites and face detector...")
+    init_pool = ThreadPoolExecutor(max_workers=3)
+    camera_future = init_pool.submit(start_camera)
+    cats_future = init_pool.submit(load_all_cats, "cat.png")
+    detector_future = init_pool.submit(FaceDetector, backend=DETECTOR_BACKEND,
+                                       model_path=DETECTOR_MODEL)
+    init_pool.shutdown(wait=True)
     
-    # Load cat faces
-    print("\n2. Loading cat sprites...")
     try:
-        cat_faces = load_all_cats("cat.png")
+        cam0 = camera_future.result()
+    except Exception as e:
+        print(f"Error starting camera: {e}")
+        return
+    
+    try:
+        cat_faces = cats_future.result()
         print(f"Loaded {len(cat_faces)} cat faces")
     except Exception as e:
         print(f"Error loading cats: {e}")
         cam0.stop_preview()
         return
     
-    # Initialize face detector
-    print("\n3. Initializing face detector...")
     try:
-        face_detector = FaceDetector()
+        face_detector = detector_future.result()
     except Exception as e:
         print(f" Error initializing face detector: {e}")
         cam0.stop_preview()
         return
     
+    print(f"Components ready after {time.perf_counter() - PROCESS_START:.2f}s")
+    
     # Initialize head swapper
-    print("\n4. Initializing head swapper...")
+    print("\n2. Initializing head swapper...")
     head_swapper = HeadSwapper(cat_faces, scale_factor=1.3)
     
     print("\n" + "-"*60)
     print("LIVE TRACKING WINDOW - Press keys for controls:")
     print("  [Q] - Quit")
     print("  [S] - Save screenshot")
+    print("  [R] - Start/stop recording the cat stream")
     print("  [C] - Change cat set")
     print("  [+] - Increase cat size")
     print("  [-] - Decrease cat size")
     print("  [D] - Toggle debug mode (show face boxes)")
+    print("  [P] - Toggle performance mode (hide info panel)")
+    print("  [A] - Toggle adaptive quality")
     print("-"*60 + "\n")
     
     # Stats
-    frame_count = 0
-    start_time = time.time()
+    metrics = FrameMetrics(window=300)
+    csv_exporter = CsvExporter(metrics, METRICS_CSV, interval=METRICS_CSV_INTERVAL)
+    csv_exporter.start()
+    prometheus_exporter = None
+    if METRICS_PORT is not None:
+        prometheus_exporter = PrometheusExporter(metrics, port=METRICS_PORT, host=METRICS_HOST)
+        prometheus_exporter.start()
     screenshot_count = 0
     debug_mode = False
+    hud = HudLayer(height=210, enabled=not PERFORMANCE_MODE)
+    quality = QualityController(TARGET_FRAME_MS or 50.0, best=QUALITY_BEST, worst=QUALITY_WORST,
+                                detect_target_ms=TARGET_DETECT_MS, metrics=metrics)
+    adaptive_quality = TARGET_FRAME_MS is not None
+    metrics_text = ""
+    metrics_text_time = 0.0
+    first_frame_time = None
+    recorder = None
     
     # Create window with properties
     window_name = "Cat Head Swap - Live Tracking"
     cv.namedWindow(window_name, cv.WINDOW_NORMAL)
     cv.resizeWindow(window_name, 720, 720)
     
+    # Capture and detection run on their own threads,
+    # rendering and display stay on this thread
+    roi_detector = RoiFaceDetector(face_detector, full_sweep_interval=FULL_SWEEP_INTERVAL,
+                                   log_interval=100)
+    # Starts at the best quality level, the controller steps down from there
+    settings = quality.settings()
+    face_tracker = FaceTracker(roi_detector, detect_interval=settings['detect_interval'])
+    pipeline = Pipeline(cam0, face_tracker, detect_kwargs=dict(
+        settings['detect_kwargs'],
+        tiles=DETECT_TILES,
+    ), metrics=metrics)
+    head_swapper.set_interpolation(settings['interpolation'])
+    pipeline.start()
+    
     try:
         while True:
-            # Capture frame from camera
-            frame = cam0.capture_frame()
-            
-            # Convert RGB to BGR for OpenCV
-            frame = cv.cvtColor(frame, cv.COLOR_RGB2BGR)
-            
-            # Detect faces
-            faces = face_detector.detect_faces(
-                frame,
-                scale_factor=1.1,
-                min_neighbors=5,
-                min_size=(50, 50)
-            )
+            # Newest captured frame (converted to BGR) with newest detected faces
+            item = pipeline.get_frame()
+            if item is None:
+                continue
+            _, frame, faces, track_ids = item
             
             # Debug mode: show face boxes BEFORE swapping
             if debug_mode:
@@ -102,39 +210,47 @@ def main():
                     cv.circle(frame, (center_x, center_y), 5, (0, 0, 255), -1)
             
             # Swap heads with cats
-            frame = head_swapper.swap_heads(frame, faces)
-            
-            # Calculate FPS
-            frame_count += 1
-            elapsed = time.time() - start_time
-            fps = frame_count / elapsed if elapsed > 0 else 0
-            
-            # Create info panel at top of frame
-            info_height = 180
-            info_panel = frame[0:info_height, :].copy()
-            # Semi-transparent overlay
-            overlay = info_panel.copy()
-            cv.rectangle(overlay, (0, 0), (frame.shape[1], info_height), (0, 0, 0), -1)
-            cv.addWeighted(overlay, 0.6, info_panel, 0.4, 0, info_panel)
-            frame[0:info_height, :] = info_panel
-            
-            # Display info with better formatting
-            cv.putText(frame, f"Faces Detected: {len(faces)}", (10, 75),
-                      cv.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
-            cv.putText(frame, f"Cat Set: {head_swapper.current_cat_set}", (10, 115),
-                      cv.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
-            cv.putText(frame, f"Scale: {head_swapper.scale_factor:.1f}x", (10, 155),
-                      cv.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
+            with metrics.stage("swap"):
+                frame = head_swapper.swap_heads(frame, faces, track_ids)
             
-            if debug_mode:
-                cv.putText(frame, "DEBUG MODE - RED BOXES", (400, 35),
-                          cv.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
+            # Record the composited frame without the info panel
+            if recorder is not None:
+                recorder.submit(frame.copy())
+                rec_stats = recorder.get_stats()
+                metrics.set_counter("dropped_record", rec_stats['dropped'])
+                metrics.set_counter("record_queue_depth", rec_stats['queue_depth'])
+            
+            # Info panel, re-rendered only when its text changes
+            with metrics.stage("hud"):
+                now = time.time()
+                if hud.enabled and now - metrics_text_time >= HUD_METRICS_REFRESH:
+                    metrics_text = metrics.hud_text()
+                    metrics_text_time = now
+                hud_lines = [
+                    (metrics_text, (10, 35), 0.7, (255, 255, 255), 2),
+                    (f"Faces Detected: {len(faces)}", (10, 75), 1.0, (0, 255, 0), 2),
+                    (f"Cat Set: {head_swapper.current_cat_set}", (10, 115), 1.0, (0, 255, 0), 2),
+                    (f"Scale: {head_swapper.scale_factor:.1f}x", (10, 155), 1.0, (0, 255, 0), 2),
+                    (quality.hud_text() if adaptive_quality else "Quality: fixed",
+                     (10, 192), 0.6, (0, 255, 255), 1),
+                ]
+                if debug_mode:
+                    hud_lines.append(("DEBUG MODE - RED BOXES", (600, 75), 1.0, (0, 0, 255), 2))
+                hud.draw(frame, hud_lines)
             
-            # Show live tracking window
-            cv.imshow(window_name, frame)
+            # Show live tracking window, waitKey is what actually paints it
+            with metrics.stage("display"):
+                cv.imshow(window_name, frame)
+                key = cv.waitKey(1) & 0xFF
             
-            # Handle key presses
-            key = cv.waitKey(1) & 0xFF
+            metrics.frame_done()
+            if adaptive_quality and quality.frame_done():
+                apply_quality(quality.settings(), pipeline, face_tracker, head_swapper)
+                metrics.set_counter("quality_changes", quality.changes)
+            if first_frame_time is None:
+                first_frame_time = time.perf_counter() - PROCESS_START
+                print(f"Time to first composited frame: {first_frame_time:.2f}s")
+            keys_start = time.perf_counter()
             
             if key == ord('q'):
                 print("\nQuitting...")
@@ -146,6 +262,16 @@ def main():
                 print(f" Screenshot saved: {filename}")
                 screenshot_count += 1
             
+            elif key == ord('r'):
+                if recorder is None:
+                    filename = os.path.join(OUTPUT_DIR, f"headswap_{time.strftime('%Y%m%d_%H%M%S')}.mp4")
+                    fps = round(metrics.fps()) or RECORD_FPS
+                    recorder = Recorder(filename, fps=fps)
+                    recorder.start()
+                else:
+                    recorder.stop()
+                    recorder = None
+            
             elif key == ord('c'):
                 cat_set = head_swapper.change_cat_set()
                 print(f"Changed to cat set: {cat_set}")
@@ -161,6 +287,22 @@ def main():
             elif key == ord('d'):
                 debug_mode = not debug_mode
                 print(f"Debug mode: {'ON' if debug_mode else 'OFF'}")
+            
+            elif key == ord('a'):
+                adaptive_quality = not adaptive_quality
+                if adaptive_quality:
+                    quality.reset()
+                else:
+                    # Back to the best settings while fixed
+                    quality.reset(level=0)
+                    apply_quality(quality.settings(), pipeline, face_tracker, head_swapper)
+                print(f"Adaptive quality: {'ON' if adaptive_quality else 'OFF'}")
+            
+            elif key == ord('p'):
+                hud.enabled = not hud.enabled
+                print(f"Performance mode: {'OFF' if hud.enabled else 'ON'}")
+            
+            metrics.record("keys", (time.perf_counter() - keys_start) * 1000.0)
     
     except KeyboardInterrupt:
         print("\nInterrupted by user...")
@@ -175,12 +317,32 @@ def main():
         print("\n" + "-"*60)
         print("SUMMARY")
         print("-"*60)
+        stats = pipeline.get_stats()
+        print(f"Frames captured: {stats['captured']}")
+        print(f"Detections run: {stats['detections']} ({stats['detect_fps']:.1f}/s)")
+        print(f"Frames dropped (render/detect): {stats['dropped_render']}/{stats['dropped_detect']}")
+        roi_stats = roi_detector.get_stats()
+        print(f"Mean frame area scanned: {roi_stats['mean_scan_fraction'] * 100:.1f}%")
+        snap = metrics.snapshot()
+        if first_frame_time is not None:
+            print(f"Time to first composited frame: {first_frame_time:.2f}s")
+        print(f"Recent FPS: {snap['fps']:.1f}")
+        print(f"Quality level {quality.level}/{quality.steps - 1} after {quality.changes} changes: "
+              f"{quality.describe()}")
+        for name, stage in snap['stages'].items():
+            print(f"  {name:<8} p50 {stage['p50']:6.1f} ms  p95 {stage['p95']:6.1f} ms  p99 {stage['p99']:6.1f} ms")
         print(f"Screenshots saved: {screenshot_count}")
 
         if screenshot_count > 0:
             print(f"Output folder: {OUTPUT_DIR}/")
         print("-"*60 + "\n")
         
+        if recorder is not None:
+            recorder.stop()
+        pipeline.stop()
+        csv_exporter.stop()
+        if prometheus_exporter is not None:
+            prometheus_exporter.stop()
         print("Stopping camera...")
         time.sleep(1)
         cam0.stop_preview()
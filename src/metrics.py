@@ -0,0 +1,242 @@
+import csv
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+# Stages in the order they happen for one frame
+STAGES = ["capture", "convert", "detect", "swap", "hud", "display", "keys"]
+
+
+class RollingWindow:
+    def __init__(self, size=300):
+        """Last `size` samples of one measurement"""
+        self.values = deque(maxlen=size)
+        self.total_count = 0
+
+    def add(self, value):
+        self.values.append(value)
+        self.total_count += 1
+
+    def percentiles(self, ps=(50, 95, 99)):
+        """Percentiles of the current window, zeros if empty"""
+        if not self.values:
+            return [0.0 for _ in ps]
+        return [float(v) for v in np.percentile(np.fromiter(self.values, float), ps)]
+
+
+class FrameMetrics:
+    def __init__(self, window=300):
+        """
+        Rolling per-stage latency, frame rate and drop counters
+
+        Stages may be recorded from any thread.
+        """
+        self.window = window
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.frame_intervals = RollingWindow(window)
+        self.last_frame_time = None
+        self.frames = 0
+        self.counters = {}
+
+    def record(self, stage, ms):
+        """Add one sample (milliseconds) for a stage"""
+        with self.lock:
+            if stage not in self.stages:
+                self.stages[stage] = RollingWindow(self.window)
+            self.stages[stage].add(ms)
+
+    def samples_since(self, stage, count):
+        """
+        Samples of a stage recorded after the first `count` ones
+
+        Returns:
+            (total count, list of the newer samples still in the window)
+        """
+        with self.lock:
+            window = self.stages.get(stage)
+            if window is None:
+                return 0, []
+            new = min(window.total_count - count, len(window.values))
+            values = list(window.values)[len(window.values) - new:] if new > 0 else []
+            return window.total_count, values
+
+    @contextmanager
+    def stage(self, name):
+        """Time the body of a with block as one sample of stage `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000.0)
+
+    def frame_done(self):
+        """Mark the end of a displayed frame (for the rolling FPS)"""
+        now = time.perf_counter()
+        with self.lock:
+            if self.last_frame_time is not None:
+                self.frame_intervals.add((now - self.last_frame_time) * 1000.0)
+            self.last_frame_time = now
+            self.frames += 1
+
+    def set_counter(self, name, value):
+        """Set a monotonically growing counter such as dropped frames"""
+        with self.lock:
+            self.counters[name] = value
+
+    def fps(self):
+        """Frame rate over the rolling window"""
+        with self.lock:
+            values = self.frame_intervals.values
+            if not values:
+                return 0.0
+            return 1000.0 * len(values) / sum(values)
+
+    def snapshot(self):
+        """
+        Current statistics
+
+        Returns:
+            Dict with fps, frames, counters and per-stage p50/p95/p99/mean ms
+        """
+        with self.lock:
+            stages = {}
+            names = [s for s in STAGES if s in self.stages] + \
+                    [s for s in self.stages if s not in STAGES]
+            for name in names:
+                window = self.stages[name]
+                p50, p95, p99 = window.percentiles()
+                stages[name] = {
+                    'p50': p50, 'p95': p95, 'p99': p99,
+                    'mean': float(np.mean(window.values)) if window.values else 0.0,
+                    'count': window.total_count,
+                }
+            counters = dict(self.counters)
+            frames = self.frames
+        return {'fps': self.fps(), 'frames': frames, 'counters': counters, 'stages': stages}
+
+    def hud_text(self, stages=("detect", "swap")):
+        """Short one-line summary for the HUD"""
+        snap = self.snapshot()
+        parts = [f"FPS {snap['fps']:.1f}"]
+        for name in stages:
+            if name in snap['stages']:
+                parts.append(f"{name} p95 {snap['stages'][name]['p95']:.0f}ms")
+        dropped = sum(v for k, v in snap['counters'].items() if k.startswith('dropped'))
+        parts.append(f"drop {dropped}")
+        return "  ".join(parts)
+
+
+class CsvExporter:
+    def __init__(self, metrics, path, interval=5.0):
+        """
+        Append a row per stage to a CSV file every `interval` seconds
+        """
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="metrics-csv", daemon=True)
+
+    def start(self):
+        new_file = not os.path.exists(self.path)
+        if new_file:
+            with open(self.path, 'w', newline='') as f:
+                csv.writer(f).writerow(['timestamp', 'stage', 'p50_ms', 'p95_ms', 'p99_ms',
+                                        'mean_ms', 'count', 'fps', 'dropped'])
+        self.thread.start()
+        print(f"Writing metrics to {self.path} every {self.interval:.0f}s")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+        self.write_row()
+
+    def write_row(self):
+        snap = self.metrics.snapshot()
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        dropped = sum(v for k, v in snap['counters'].items() if k.startswith('dropped'))
+        with open(self.path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            for name, stage in snap['stages'].items():
+                writer.writerow([timestamp, name, f"{stage['p50']:.3f}", f"{stage['p95']:.3f}",
+                                 f"{stage['p99']:.3f}", f"{stage['mean']:.3f}", stage['count'],
+                                 f"{snap['fps']:.2f}", dropped])
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.write_row()
+            except OSError as e:
+                print(f"Error writing metrics: {e}")
+
+
+def prometheus_text(metrics, prefix="catswap"):
+    """Render a snapshot in the Prometheus text exposition format"""
+    snap = metrics.snapshot()
+    lines = [
+        f"# TYPE {prefix}_fps gauge",
+        f"{prefix}_fps {snap['fps']:.3f}",
+        f"# TYPE {prefix}_frames_total counter",
+        f"{prefix}_frames_total {snap['frames']}",
+        f"# TYPE {prefix}_stage_latency_ms summary",
+    ]
+    for name, stage in snap['stages'].items():
+        for q, key in (("0.5", 'p50'), ("0.95", 'p95'), ("0.99", 'p99')):
+            lines.append(f'{prefix}_stage_latency_ms{{stage="{name}",quantile="{q}"}} {stage[key]:.3f}')
+        lines.append(f'{prefix}_stage_latency_ms_count{{stage="{name}"}} {stage["count"]}')
+    lines.append(f"# TYPE {prefix}_events_total counter")
+    for name, value in snap['counters'].items():
+        lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusExporter:
+    def __init__(self, metrics, port=9100, host="127.0.0.1"):
+        """
+        Serve /metrics in Prometheus text format from a background thread
+
+        Binds to localhost by default, use host="0.0.0.0" to expose it.
+        """
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        # Only needed when the endpoint is enabled
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = prometheus_text(metrics).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep the console for the app
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self.thread.start()
+        print(f"Serving metrics at http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,211 @@
+import queue
+import threading
+import time
+from face_detection import FaceTracker
+
+
+class LatestQueue:
+    def __init__(self, maxsize=1):
+        """
+        Bounded queue that drops the oldest item instead of blocking,
+        so consumers always get the newest frames
+        """
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.lock = threading.Lock()
+        self.dropped = 0
+
+    def put(self, item):
+        """Add item, dropping the oldest one if the queue is full"""
+        with self.lock:
+            while True:
+                try:
+                    self.queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def get(self, timeout=None):
+        """Get the next item, or None if nothing arrived within timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class CaptureThread(threading.Thread):
+    def __init__(self, camera, render_queue, detect_queue, stop_event, metrics=None):
+        """
+        Capture frames and hand them to both stages
+
+        The detector gets a grayscale image (a view of the luma plane in
+        YUV420 mode), the render stage gets the raw capture and converts
+        it to BGR itself, so frames dropped before display are never
+        converted. With a lores stream the grayscale image is smaller
+        than the frame, the frame size goes along so boxes come back in
+        frame coordinates.
+        """
+        super().__init__(name="capture", daemon=True)
+        self.camera = camera
+        self.render_queue = render_queue
+        self.detect_queue = detect_queue
+        self.stop_event = stop_event
+        self.metrics = metrics
+        self.frame_id = 0
+        self.error = None
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                start = time.perf_counter()
+                gray, raw = self.camera.capture_for_detection()
+                if self.metrics is not None:
+                    self.metrics.record("capture", (time.perf_counter() - start) * 1000.0)
+
+                self.frame_id += 1
+                full_size = self.camera.frame_size(raw)
+                self.detect_queue.put((self.frame_id, gray, full_size))
+                self.render_queue.put((self.frame_id, raw))
+        except Exception as e:
+            self.error = e
+            self.stop_event.set()
+
+
+class DetectionWorker(threading.Thread):
+    def __init__(self, face_detector, detect_queue, stop_event, detect_kwargs=None, metrics=None):
+        """
+        Run face detection on the newest grayscale frame and publish
+        the newest result for the render stage
+
+        face_detector may also be a FaceTracker, then results carry track IDs.
+        """
+        super().__init__(name="detect", daemon=True)
+        self.face_detector = face_detector
+        self.detect_queue = detect_queue
+        self.stop_event = stop_event
+        self.detect_kwargs = detect_kwargs or {}
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.faces = ()
+        self.track_ids = None
+        self.frame_id = 0
+        self.detections = 0
+        self.error = None
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                item = self.detect_queue.get(timeout=0.1)
+                if item is None:
+                    continue
+                frame_id, gray, full_size = item
+                detect_kwargs = self.detect_kwargs
+                if tuple(full_size) != (gray.shape[1], gray.shape[0]):
+                    detect_kwargs = dict(detect_kwargs, full_size=full_size)
+                start = time.perf_counter()
+                if isinstance(self.face_detector, FaceTracker):
+                    faces, track_ids = self.face_detector.update(gray, **detect_kwargs)
+                else:
+                    faces = self.face_detector.detect_faces(gray, **detect_kwargs)
+                    track_ids = None
+                if self.metrics is not None:
+                    self.metrics.record("detect", (time.perf_counter() - start) * 1000.0)
+
+                with self.lock:
+                    self.faces = faces
+                    self.track_ids = track_ids
+                    self.frame_id = frame_id
+                    self.detections += 1
+        except Exception as e:
+            self.error = e
+            self.stop_event.set()
+
+    def latest(self):
+        """Get (frame_id, faces, track_ids) of the newest finished detection"""
+        with self.lock:
+            return self.frame_id, self.faces, self.track_ids
+
+
+class Pipeline:
+    def __init__(self, camera, face_detector, detect_kwargs=None, metrics=None):
+        """
+        Capture -> detect -> render pipeline
+
+        Capture and detection run on their own threads (OpenCV releases
+        the GIL), the caller renders and displays on the main thread.
+        With a FrameMetrics, capture/convert/detect timings and dropped
+        frame counts are recorded there.
+        """
+        self.metrics = metrics
+        self.camera = camera
+        self.stop_event = threading.Event()
+        self.render_queue = LatestQueue(maxsize=1)
+        self.detect_queue = LatestQueue(maxsize=1)
+        self.capture_thread = CaptureThread(camera, self.render_queue,
+                                            self.detect_queue, self.stop_event, metrics)
+        self.detection_worker = DetectionWorker(face_detector, self.detect_queue,
+                                                self.stop_event, detect_kwargs, metrics)
+        self.start_time = None
+
+    def start(self):
+        """Start capture and detection threads"""
+        self.start_time = time.time()
+        self.capture_thread.start()
+        self.detection_worker.start()
+        print("Pipeline started (capture + detection threads)")
+
+    def stop(self):
+        """Signal threads to stop and wait for them"""
+        self.stop_event.set()
+        for thread in (self.capture_thread, self.detection_worker):
+            if thread.is_alive():
+                thread.join(timeout=2.0)
+        print("Pipeline stopped")
+
+    def get_frame(self, timeout=1.0):
+        """
+        Get the newest captured frame with the newest available boxes
+
+        Returns:
+            (frame_id, frame, faces, track_ids) or None on timeout
+        """
+        item = self.render_queue.get(timeout=timeout)
+        if item is None:
+            self.raise_errors()
+            return None
+        frame_id, raw = item
+        start = time.perf_counter()
+        frame = self.camera.to_bgr(raw)
+        if self.metrics is not None:
+            self.metrics.record("convert", (time.perf_counter() - start) * 1000.0)
+        _, faces, track_ids = self.detection_worker.latest()
+        if self.metrics is not None:
+            self.metrics.set_counter("dropped_render", self.render_queue.dropped)
+            self.metrics.set_counter("dropped_detect", self.detect_queue.dropped)
+        return frame_id, frame, faces, track_ids
+
+    def set_detect_kwargs(self, **changes):
+        """Change detection settings; the worker picks them up with its next frame"""
+        worker = self.detection_worker
+        # Swap in a new dict so the worker never sees a half updated one
+        worker.detect_kwargs = dict(worker.detect_kwargs, **changes)
+
+    def raise_errors(self):
+        """Re-raise an exception that stopped one of the worker threads"""
+        for thread in (self.capture_thread, self.detection_worker):
+            if thread.error is not None:
+                raise RuntimeError(f"{thread.name} thread failed: {thread.error}")
+
+    def get_stats(self):
+        """Get detection rate and dropped frame counts"""
+        elapsed = time.time() - self.start_time if self.start_time else 0
+        return {
+            'captured': self.capture_thread.frame_id,
+            'detections': self.detection_worker.detections,
+            'detect_fps': self.detection_worker.detections / elapsed if elapsed > 0 else 0,
+            'dropped_render': self.render_queue.dropped,
+            'dropped_detect': self.detect_queue.dropped,
+        }
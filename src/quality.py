@@ -0,0 +1,200 @@
+import time
+from collections import deque
+
+import cv2 as cv
+import numpy as np
+
+
+# Sprite resize filters from best to cheapest
+INTERPOLATIONS = [cv.INTER_AREA, cv.INTER_LINEAR, cv.INTER_NEAREST]
+INTERPOLATION_NAMES = {cv.INTER_AREA: "area", cv.INTER_LINEAR: "linear", cv.INTER_NEAREST: "nearest"}
+
+# Settings at the best and the cheapest quality level. Coarser scale
+# steps give the cascade fewer neighbor hits per face, so min_neighbors
+# goes down as scale_factor goes up to keep faces found.
+BEST_QUALITY = {
+    'scale_factor': 1.1,
+    'min_neighbors': 5,
+    'min_size': 50,
+    'detect_scale': 1.0,
+    'detect_interval': 5,
+    'interpolation': 0,
+}
+WORST_QUALITY = {
+    'scale_factor': 1.3,
+    'min_neighbors': 4,
+    'min_size': 90,
+    'detect_scale': 0.5,
+    'detect_interval': 12,
+    'interpolation': len(INTERPOLATIONS) - 1,
+}
+
+
+class QualityController:
+    def __init__(self, target_ms, best=None, worst=None, steps=6, window=30,
+                 hysteresis=0.15, upgrade_patience=3, level=0,
+                 detect_target_ms=None, metrics=None, settle_frames=5):
+        """
+        Feedback controller that trades detection and sprite quality
+        for frame time and detection latency
+
+        Quality levels run in `steps` even steps from `best` to `worst`
+        (missing keys come from BEST_QUALITY / WORST_QUALITY). After
+        every `window` frames the load is checked: the median frame time
+        against target_ms and, with a FrameMetrics and detect_target_ms,
+        the p95 of the "detect" stage samples from that window against
+        detect_target_ms. Detection runs on its own thread, so its
+        settings hardly change the frame time; its p95 is the cost of a
+        full detection (tracking-only updates are much cheaper), which
+        is how stale the boxes get. The worse of the two ratios decides:
+        above 1 + hysteresis drops one level right away, below
+        1 - hysteresis for upgrade_patience windows in a row climbs one
+        level. After a change the next settle_frames frames and the
+        detections that ran meanwhile are skipped, as they may still
+        have used the old settings.
+        """
+        self.target_ms = target_ms
+        self.best = dict(BEST_QUALITY, **(best or {}))
+        self.worst = dict(WORST_QUALITY, **(worst or {}))
+        self.steps = max(2, steps)
+        self.hysteresis = hysteresis
+        self.upgrade_patience = upgrade_patience
+        self.level = min(max(0, level), self.steps - 1)
+        self.frame_times = deque(maxlen=window)
+        self.last_frame = None
+        self.detect_target_ms = detect_target_ms
+        self.metrics = metrics
+        self.detect_seen = 0
+        self.settle_frames = settle_frames
+        self.settling = 0
+        self.good_windows = 0
+        self.changes = 0
+        self.last_decision = "start"
+        self._skip_detections()
+
+    def reset(self, level=None):
+        """Forget measured frame and detect times, optionally jumping to a level"""
+        if level is not None:
+            self.level = min(max(0, level), self.steps - 1)
+            self.last_decision = "reset"
+        self.frame_times.clear()
+        self.last_frame = None
+        self.good_windows = 0
+        self.settling = 0
+        self._skip_detections()
+
+    def _skip_detections(self):
+        """Only count detect samples recorded from now on"""
+        if self.metrics is not None:
+            self.detect_seen, _ = self.metrics.samples_since("detect", 0)
+
+    def _detect_p95(self):
+        """p95 detect latency since the last check, None if not tracked or no samples"""
+        if self.metrics is None or self.detect_target_ms is None:
+            return None
+        self.detect_seen, samples = self.metrics.samples_since("detect", self.detect_seen)
+        if not samples:
+            return None
+        return float(np.percentile(samples, 95))
+
+    def settings(self, level=None):
+        """
+        Detection and sprite settings of a quality level
+
+        Returns:
+            Dict with detect_kwargs (scale_factor, min_neighbors, min_size,
+            detect_scale), detect_interval and interpolation
+        """
+        level = self.level if level is None else level
+        t = level / (self.steps - 1)
+
+        def lerp(key):
+            return self.best[key] + (self.worst[key] - self.best[key]) * t
+
+        min_size = int(round(lerp('min_size')))
+        return {
+            'detect_kwargs': {
+                'scale_factor': round(lerp('scale_factor'), 3),
+                'min_neighbors': int(round(lerp('min_neighbors'))),
+                'min_size': (min_size, min_size),
+                'detect_scale': round(lerp('detect_scale'), 3),
+            },
+            'detect_interval': int(round(lerp('detect_interval'))),
+            'interpolation': INTERPOLATIONS[int(round(lerp('interpolation')))],
+        }
+
+    def frame_done(self, frame_ms=None):
+        """
+        Report a finished frame, measured from the previous call if
+        frame_ms is not given
+
+        Returns:
+            True if the quality level changed and the settings need applying
+        """
+        now = time.perf_counter()
+        if frame_ms is None:
+            if self.last_frame is None:
+                self.last_frame = now
+                return False
+            frame_ms = (now - self.last_frame) * 1000.0
+        self.last_frame = now
+
+        if self.settling > 0:
+            self.settling -= 1
+            if self.settling == 0:
+                self._skip_detections()
+            return False
+
+        self.frame_times.append(frame_ms)
+        if len(self.frame_times) < self.frame_times.maxlen:
+            return False
+
+        median = float(np.median(self.frame_times))
+        self.frame_times.clear()
+        load = median / self.target_ms
+        detect_p95 = self._detect_p95()
+        if detect_p95 is not None:
+            load = max(load, detect_p95 / self.detect_target_ms)
+
+        previous = self.level
+        if load > 1.0 + self.hysteresis:
+            self.good_windows = 0
+            if self.level < self.steps - 1:
+                self.level += 1
+        elif load < 1.0 - self.hysteresis:
+            self.good_windows += 1
+            if self.good_windows >= self.upgrade_patience and self.level > 0:
+                self.level -= 1
+                self.good_windows = 0
+        else:
+            self.good_windows = 0
+
+        if self.level == previous:
+            return False
+
+        self.changes += 1
+        self.settling = self.settle_frames
+        direction = "down" if self.level > previous else "up"
+        measured = f"median frame {median:.1f}/{self.target_ms:.1f} ms"
+        self.last_decision = f"{direction} at {median:.0f}ms"
+        if detect_p95 is not None:
+            measured += f", detect p95 {detect_p95:.1f}/{self.detect_target_ms:.1f} ms"
+            self.last_decision += f"/{detect_p95:.0f}ms"
+        print(f"Quality {direction} to level {self.level}/{self.steps - 1}: "
+              f"{measured} -> {self.describe()}")
+        return True
+
+    def describe(self):
+        """One-line summary of the current settings"""
+        s = self.settings()
+        kw = s['detect_kwargs']
+        return (f"sf {kw['scale_factor']:.2f} nb {kw['min_neighbors']} min {kw['min_size'][0]} "
+                f"det {kw['detect_scale']:.2f}x/{s['detect_interval']} "
+                f"{INTERPOLATION_NAMES.get(s['interpolation'], s['interpolation'])}")
+
+    def hud_text(self):
+        """Short HUD line with the level, last decision and settings"""
+        target = f"{self.target_ms:.0f}ms"
+        if self.metrics is not None and self.detect_target_ms is not None:
+            target += f"/{self.detect_target_ms:.0f}ms"
+        return f"Q{self.level}/{self.steps - 1} ({self.last_decision}, target {target}) {self.describe()}"
@@ -0,0 +1,124 @@
+import queue
+import threading
+import time
+
+import cv2 as cv
+
+
+class Recorder:
+    def __init__(self, path, fps=20.0, max_queue=32, fourcc="mp4v", max_bytes=None):
+        """
+        Record frames to an MP4 file from a background encoder thread
+
+        submit() never blocks the caller: when the encoder falls behind
+        and the queue is full the frame is dropped and counted. max_bytes
+        also caps the memory held by queued frames, so large frames are
+        dropped before they pile up. The writer is opened on the first
+        frame, so the size comes from it. Frames are written as given
+        (BGR), the caller must not modify a frame after submitting it.
+        """
+        self.path = path
+        self.fps = fps
+        self.fourcc = fourcc
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.max_bytes = max_bytes
+        self.queued_bytes = 0
+        self.max_queued_bytes = 0
+        self.bytes_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self.writer = None
+        self.frame_size = None
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.encode_time = 0.0
+        self.error = None
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.thread.start()
+        print(f"Recording to {self.path}")
+
+    def submit(self, frame):
+        """
+        Queue a frame for encoding
+
+        Returns:
+            False if the frame was dropped (queue full or recorder stopped)
+        """
+        if not self.running:
+            return False
+        self.submitted += 1
+        with self.bytes_lock:
+            if self.max_bytes is not None and self.queued_bytes + frame.nbytes > self.max_bytes:
+                self.dropped += 1
+                return False
+            try:
+                self.queue.put_nowait(frame)
+            except queue.Full:
+                self.dropped += 1
+                return False
+            self.queued_bytes += frame.nbytes
+            self.max_queued_bytes = max(self.max_queued_bytes, self.queued_bytes)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+
+    def _open(self, frame):
+        height, width = frame.shape[:2]
+        self.frame_size = (width, height)
+        self.writer = cv.VideoWriter(self.path, cv.VideoWriter_fourcc(*self.fourcc),
+                                     self.fps, self.frame_size)
+        if not self.writer.isOpened():
+            raise IOError(f"Could not open video writer for {self.path}")
+
+    def _run(self):
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            with self.bytes_lock:
+                self.queued_bytes -= frame.nbytes
+            if self.error is not None:
+                continue  # keep draining so submit never blocks
+            try:
+                start = time.perf_counter()
+                if self.writer is None:
+                    self._open(frame)
+                if (frame.shape[1], frame.shape[0]) != self.frame_size:
+                    frame = cv.resize(frame, self.frame_size, interpolation=cv.INTER_AREA)
+                self.writer.write(frame)
+                self.encode_time += time.perf_counter() - start
+                self.written += 1
+            except Exception as e:
+                self.error = e
+                print(f"Recording error: {e}")
+
+    def stop(self):
+        """Encode everything still queued, close the file and return stats"""
+        if not self.running:
+            return self.get_stats()
+        self.running = False
+        self.queue.put(None)
+        self.thread.join()
+        if self.writer is not None:
+            self.writer.release()
+        stats = self.get_stats()
+        print(f"Recording saved: {self.path} ({stats['written']} frames, {stats['dropped']} dropped)")
+        return stats
+
+    def get_stats(self):
+        """Written/dropped counts, queue depth and bytes (back-pressure) and encode time"""
+        return {
+            'submitted': self.submitted,
+            'written': self.written,
+            'dropped': self.dropped,
+            'queue_depth': self.queue.qsize(),
+            'max_queue_depth': self.max_depth,
+            'queue_capacity': self.queue.maxsize,
+            'queue_bytes': self.queued_bytes,
+            'max_queue_bytes': self.max_queued_bytes,
+            'queue_bytes_capacity': self.max_bytes,
+            'encode_ms': self.encode_time * 1000.0 / self.written if self.written else 0.0,
+        }
@@ -0,0 +1,224 @@
+import json
+import os
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+# Layout:
+#   <path>       frame data, frames appended back to back
+#   <path>.idx   one JSON line per frame: offset, nbytes, shape, dtype,
+#                timestamp and codec ("raw" or "zlib")
+# Raw frames are read as views into a memory map of <path>, zlib frames
+# are decompressed when accessed. Both files are append-only, a session
+# cut short keeps every frame whose data was fully written. Reopening for
+# writing drops torn index lines and data past the last complete frame.
+
+INDEX_SUFFIX = ".idx"
+
+
+def _read_index(path, data_size):
+    """
+    Index entries whose line is complete and whose data was fully written
+
+    Returns:
+        (entries, number of index lines skipped)
+    """
+    entries = []
+    skipped = 0
+    try:
+        f = open(path + INDEX_SUFFIX)
+    except FileNotFoundError:
+        return entries, skipped
+    with f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                valid = entry['offset'] + entry['nbytes'] <= data_size
+            except (ValueError, TypeError, KeyError):
+                valid = False  # partially written or glued onto a torn line
+            if valid:
+                entries.append(entry)
+            else:
+                skipped += 1
+    return entries, skipped
+
+
+class ShotArchiveWriter:
+    def __init__(self, path, compress=False, level=1, workers=2, max_pending=8):
+        """
+        Append frames to a shot archive
+
+        With compress=True frames are zlib compressed on a thread pool
+        (zlib releases the GIL) and written in capture order. An existing
+        archive is repaired first (see _recover), so frames appended
+        after a crash are not hidden behind a torn tail.
+        """
+        self.path = path
+        self.compress = compress
+        self.level = level
+        self.max_pending = max_pending
+        self._recover()
+        self.data_file = open(path, 'ab')
+        self.index_file = open(path + INDEX_SUFFIX, 'a')
+        self.offset = self.data_file.tell()
+        self.count = 0
+        self.pending = deque()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="archive") if compress else None
+
+    def _recover(self):
+        """
+        Drop torn or dangling index lines and cut the data file after
+        the last complete frame, so appends start from a clean tail
+        """
+        if not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        entries, skipped = _read_index(self.path, size)
+        end = max((e['offset'] + e['nbytes'] for e in entries), default=0)
+        index_path = self.path + INDEX_SUFFIX
+        if skipped or not self._index_ends_cleanly(index_path):
+            tmp_path = index_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+            os.replace(tmp_path, index_path)
+        if end < size:
+            os.truncate(self.path, end)
+        if skipped or end < size:
+            print(f"Recovered shot archive {self.path}: {len(entries)} frames kept, "
+                  f"{skipped} index lines and {size - end} data bytes dropped")
+
+    @staticmethod
+    def _index_ends_cleanly(index_path):
+        """True if the index exists and is empty or ends with a newline"""
+        try:
+            with open(index_path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return True
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) == b"\n"
+        except FileNotFoundError:
+            return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, frame, timestamp=None):
+        """Queue one frame for writing (copies it if compression is on)"""
+        if timestamp is None:
+            timestamp = time.time()
+        frame = np.ascontiguousarray(frame)
+        meta = {'shape': list(frame.shape), 'dtype': frame.dtype.str, 'timestamp': timestamp}
+
+        if self.pool is None:
+            self._write(meta, 'raw', frame.data)
+            return
+
+        # The caller may reuse its buffer, so compress a private copy
+        future = self.pool.submit(zlib.compress, frame.tobytes(), self.level)
+        self.pending.append((meta, future))
+        self._drain(block=len(self.pending) > self.max_pending)
+
+    def _drain(self, block=False):
+        """Write finished frames from the head of the queue, in order"""
+        while self.pending and (block or self.pending[0][1].done()):
+            meta, future = self.pending.popleft()
+            self._write(meta, 'zlib', future.result())
+            block = block and len(self.pending) > self.max_pending
+
+    def _write(self, meta, codec, payload):
+        nbytes = len(payload) if codec == 'zlib' else payload.nbytes
+        self.data_file.write(payload)
+        entry = dict(meta, offset=self.offset, nbytes=nbytes, codec=codec)
+        self.index_file.write(json.dumps(entry) + "\n")
+        self.offset += nbytes
+        self.count += 1
+
+    def flush(self):
+        """Write everything queued so far and flush both files"""
+        while self.pending:
+            meta, future = self.pending.popleft()
+            self._write(meta, 'zlib', future.result())
+        self.data_file.flush()
+        self.index_file.flush()
+
+    def close(self):
+        self.flush()
+        if self.pool is not None:
+            self.pool.shutdown()
+        self.data_file.close()
+        self.index_file.close()
+
+
+class ShotArchive:
+    def __init__(self, path):
+        """
+        Open a shot archive for reading
+
+        Only the index is read up front, frames are read on access.
+        Bad index lines are skipped, not treated as the end, so frames
+        written after a torn line stay readable.
+        """
+        self.path = path
+        size = os.path.getsize(path)
+        # Torn lines and frames whose data never got written are skipped
+        self.entries, _ = _read_index(path, size)
+        self.data = np.memmap(path, dtype=np.uint8, mode='r') if size > 0 else None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        """
+        Get one frame
+
+        Returns:
+            Read-only view into the memory map for raw frames,
+            a decompressed array for zlib frames
+        """
+        entry = self.entries[index]
+        dtype = np.dtype(entry['dtype'])
+        shape = tuple(entry['shape'])
+        start = entry['offset']
+        chunk = self.data[start:start + entry['nbytes']]
+        if entry['codec'] == 'zlib':
+            return np.frombuffer(zlib.decompress(chunk), dtype=dtype).reshape(shape)
+        return np.ndarray(shape, dtype=dtype, buffer=chunk)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def timestamps(self):
+        return [entry['timestamp'] for entry in self.entries]
+
+    def find(self, timestamp):
+        """Index of the last frame taken at or before timestamp"""
+        times = self.timestamps
+        index = int(np.searchsorted(times, timestamp, side='right')) - 1
+        return max(0, index)
+
+    def info(self):
+        """Frame count, time span and sizes"""
+        raw = sum(int(np.prod(e['shape'])) * np.dtype(e['dtype']).itemsize for e in self.entries)
+        stored = sum(e['nbytes'] for e in self.entries)
+        times = self.timestamps
+        return {
+            'frames': len(self.entries),
+            'duration': times[-1] - times[0] if times else 0.0,
+            'raw_bytes': raw,
+            'stored_bytes': stored,
+        }
+
+    def close(self):
+        # np.memmap closes its file when the array is released
+        self.data = None
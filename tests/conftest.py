@@ -0,0 +1,23 @@
+import os
+import sys
+
+import cv2 as cv
+import pytest
+
+# Modules live flat in src/ and import each other by name
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+
+@pytest.fixture(scope="session")
+def hollywoof():
+    """Test image with 8 faces the Haar cascade finds"""
+    image = cv.imread(os.path.join(SRC_DIR, "hollywoof.png"))
+    assert image is not None
+    return image
+
+
+@pytest.fixture(scope="session")
+def face_detector():
+    from face_detection import FaceDetector
+    return FaceDetector()
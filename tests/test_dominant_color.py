@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import fp2_headswap
+from fp2_headswap import get_dominant_color_hist, get_dominant_color_simple
+
+
+def test_hist8_matches_simple_with_ties():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        # Mostly unique colors, so the winner is decided by a tie
+        pixels = rng.integers(0, 256, (300, 1, 3), dtype=np.uint8)
+        np.testing.assert_array_equal(get_dominant_color_hist(pixels, bits=8),
+                                      get_dominant_color_simple(pixels))
+
+
+def test_hist8_matches_simple_with_a_clear_winner():
+    rng = np.random.default_rng(1)
+    pixels = rng.integers(0, 8, (500, 1, 3), dtype=np.uint8) * 32
+    np.testing.assert_array_equal(get_dominant_color_hist(pixels, bits=8),
+                                  get_dominant_color_simple(pixels))
+
+
+def test_mode_follows_module_constant_at_call_time(monkeypatch):
+    pixels = np.array([[[10, 20, 30]], [[10, 20, 30]], [[200, 0, 0]]], dtype=np.uint8)
+    calls = []
+    monkeypatch.setattr(fp2_headswap, "get_dominant_color_hist",
+                        lambda frame: calls.append("hist") or np.array([0, 0, 0]))
+    monkeypatch.setattr(fp2_headswap, "DOMINANT_COLOR_MODE", "hist")
+    fp2_headswap.get_dominant_color(pixels)
+    assert calls == ["hist"]
+    assert fp2_headswap.ClothingColorCache().mode == "hist"
+
+
+def test_warm_mode_needs_a_warm_instance():
+    pixels = np.zeros((4, 1, 3), dtype=np.uint8)
+    with pytest.raises(ValueError):
+        fp2_headswap.get_dominant_color(pixels, mode="kmeans_warm")
+    warm = fp2_headswap.WarmKMeans()
+    fp2_headswap.get_dominant_color(pixels, mode="kmeans_warm", warm_kmeans=warm)
+    assert warm.centers is not None
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pytest
+
+from cat import cat_blend, load_all_cats
+from conftest import SRC_DIR
+from head_swap import HeadSwapper
+
+
+@pytest.fixture(scope="module")
+def head_swapper():
+    return HeadSwapper(load_all_cats(os.path.join(SRC_DIR, "cat.png"), cache_dir=None))
+
+
+def paste_each(head_swapper, frame, faces, cat_indices, order):
+    """Blend one cat per face with cat_blend, in the given order"""
+    for i in order:
+        x, y, w, h = faces[i]
+        prepared = head_swapper.sprite_cache.get(head_swapper.cat_faces, cat_indices[i], w, h,
+                                                 head_swapper.scale_factor)
+        new_h, new_w = prepared[0].shape[:2]
+        cat_blend(frame, prepared, x - (new_w - w) // 2, y - (new_h - h) // 2)
+    return frame
+
+
+LAYOUTS = {
+    # Well apart, nothing shared
+    "apart": [(40, 40, 80, 80), (300, 60, 100, 100), (120, 300, 90, 90)],
+    # Hanging over the left, right and bottom frame edges
+    "edges": [(-30, 100, 90, 90), (590, 50, 80, 80), (300, 430, 100, 100)],
+}
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_non_overlapping_faces_match_per_face_paste(hollywoof, head_swapper, layout):
+    frame = np.ascontiguousarray(hollywoof[:480, :640])
+    faces = LAYOUTS[layout]
+    expected = paste_each(head_swapper, frame.copy(), faces, [0, 1, 2], range(len(faces)))
+    result = head_swapper.swap_heads_custom(frame.copy(), faces, [0, 1, 2])
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_larger_faces_are_drawn_on_top(hollywoof, head_swapper):
+    frame = np.ascontiguousarray(hollywoof[:480, :640])
+    # Big face listed first, the small one overlaps it
+    faces = [(100, 100, 160, 160), (150, 150, 80, 80)]
+    result = head_swapper.swap_heads_custom(frame.copy(), faces, [0, 1])
+    expected = paste_each(head_swapper, frame.copy(), faces, [0, 1], [1, 0])
+    listed_order = paste_each(head_swapper, frame.copy(), faces, [0, 1], [0, 1])
+    np.testing.assert_array_equal(result, expected)
+    assert not np.array_equal(result, listed_order)
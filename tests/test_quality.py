@@ -0,0 +1,59 @@
+from metrics import FrameMetrics
+from quality import QualityController
+
+TARGET_MS = 50.0
+DETECT_TARGET_MS = 100.0
+
+
+def make_controller(**kwargs):
+    metrics = FrameMetrics()
+    quality = QualityController(TARGET_MS, window=10, upgrade_patience=2, settle_frames=3,
+                                detect_target_ms=DETECT_TARGET_MS, metrics=metrics, **kwargs)
+    return quality, metrics
+
+
+def run_window(quality, metrics, frame_ms, detect_ms, frames=10):
+    """Feed one window of frames with one detection each, return the change flags"""
+    changed = []
+    for _ in range(frames):
+        metrics.record("detect", detect_ms)
+        changed.append(quality.frame_done(frame_ms))
+    return changed
+
+
+def test_slow_detection_lowers_quality_at_fast_frame_time():
+    quality, metrics = make_controller()
+    # Render is well within budget, only detection is slow
+    assert run_window(quality, metrics, 20.0, 180.0)[-1]
+    assert quality.level == 1
+
+
+def test_frame_time_alone_still_lowers_quality():
+    quality, metrics = make_controller()
+    assert run_window(quality, metrics, 90.0, 20.0)[-1]
+    assert quality.level == 1
+
+
+def test_both_fast_raises_quality_after_patience():
+    quality, metrics = make_controller(level=3)
+    assert not any(run_window(quality, metrics, 20.0, 30.0))
+    assert run_window(quality, metrics, 20.0, 30.0)[-1]
+    assert quality.level == 2
+
+
+def test_samples_after_a_change_are_skipped():
+    quality, metrics = make_controller()
+    run_window(quality, metrics, 20.0, 180.0)
+    assert quality.level == 1
+    # In-flight detections with the old settings land while settling
+    run_window(quality, metrics, 20.0, 180.0, frames=3)
+    # A fast window afterwards must not see them
+    assert not any(run_window(quality, metrics, 20.0, 30.0))
+    assert quality.level == 1
+    assert quality.good_windows == 1
+
+
+def test_without_metrics_only_frame_time_counts():
+    quality = QualityController(TARGET_MS, window=10, detect_target_ms=DETECT_TARGET_MS)
+    assert not any(quality.frame_done(20.0) for _ in range(10))
+    assert quality.level == 0
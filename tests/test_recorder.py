@@ -0,0 +1,37 @@
+import cv2 as cv
+import numpy as np
+
+from fp2_headswap import record_size
+from recorder import Recorder
+
+
+def test_queue_is_bounded_by_bytes(tmp_path):
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    recorder = Recorder(str(tmp_path / "out.mp4"), fps=10.0, max_queue=32,
+                        max_bytes=3 * frame.nbytes)
+    # Encoder not started yet, so nothing leaves the queue
+    recorder.running = True
+    accepted = [recorder.submit(frame.copy()) for _ in range(5)]
+    assert accepted == [True, True, True, False, False]
+    stats = recorder.get_stats()
+    assert stats['queue_bytes'] == 3 * frame.nbytes
+    assert stats['dropped'] == 2
+
+    recorder.running = False
+    recorder.start()
+    stats = recorder.stop()
+    assert stats['written'] == 3
+    assert stats['queue_bytes'] == 0
+    cap = cv.VideoCapture(str(tmp_path / "out.mp4"))
+    assert cap.get(cv.CAP_PROP_FPS) == 10.0
+    cap.release()
+
+
+def test_record_size_fits_and_keeps_aspect():
+    assert record_size(640, 480) == (640, 480)
+    assert record_size(1280, 720) == (1280, 720)
+    assert record_size(1920, 1080) == (1280, 720)
+    width, height = record_size(4056, 3040)
+    assert width <= 1280 and height <= 720
+    assert width % 2 == 0 and height % 2 == 0
+    assert abs(width / height - 4056 / 3040) < 0.01
@@ -0,0 +1,32 @@
+import cv2 as cv
+
+from face_detection import RoiFaceDetector
+
+DETECT_KWARGS = {'scale_factor': 1.1, 'min_neighbors': 5, 'min_size': (30, 30)}
+
+
+def test_crowd_skips_windows(hollywoof, face_detector):
+    gray = cv.cvtColor(hollywoof, cv.COLOR_BGR2GRAY)
+    roi = RoiFaceDetector(face_detector, full_sweep_interval=100)
+    for _ in range(3):
+        faces = roi.detect_faces(gray, **DETECT_KWARGS)
+
+    # Windows around 8 faces cover most of the frame, so every call is one sweep
+    assert len(faces) == 8
+    stats = roi.get_stats()
+    assert stats['full_sweeps'] == stats['calls']
+    assert roi.last_scan_fraction == 1.0
+
+
+def test_fallback_counts_window_area(hollywoof, face_detector):
+    gray = cv.cvtColor(hollywoof, cv.COLOR_BGR2GRAY)
+    frame_h, frame_w = gray.shape
+    roi = RoiFaceDetector(face_detector, full_sweep_interval=100)
+    roi.calls = 1
+    # A "face" in a corner without one: its window comes up empty and forces a sweep
+    roi.prev_faces = [(0, 0, 40, 40)]
+    roi.detect_faces(gray, **DETECT_KWARGS)
+
+    window_area = 60 * 60  # box grown by half its size, clipped at the corner
+    assert roi.full_sweeps == 1
+    assert abs(roi.last_scan_fraction - (1.0 + window_area / (frame_w * frame_h))) < 1e-9
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pytest
+
+from shot_archive import INDEX_SUFFIX, ShotArchive, ShotArchiveWriter
+
+
+def frame(value):
+    return np.full((4, 5, 3), value, dtype=np.uint8)
+
+
+def write(path, values, compress=False):
+    with ShotArchiveWriter(path, compress=compress) as writer:
+        for value in values:
+            writer.append(frame(value))
+
+
+def values(path):
+    return [int(f[0, 0, 0]) for f in ShotArchive(path)]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_reopen_after_torn_index_tail(tmp_path, compress):
+    path = str(tmp_path / "shots.shots")
+    write(path, [1, 2], compress)
+    index_path = path + INDEX_SUFFIX
+    with open(index_path, 'rb+') as f:
+        f.truncate(os.path.getsize(index_path) - 20)
+
+    write(path, [3], compress)
+    assert values(path) == [1, 3]
+    # The data of the lost frame is cut off too
+    archive = ShotArchive(path)
+    assert os.path.getsize(path) == sum(e['nbytes'] for e in archive.entries)
+
+
+def test_reopen_after_torn_data_tail(tmp_path):
+    path = str(tmp_path / "shots.shots")
+    write(path, [1, 2])
+    with open(path, 'rb+') as f:
+        f.truncate(os.path.getsize(path) - 7)
+
+    write(path, [3])
+    assert values(path) == [1, 3]
+
+
+def test_reader_skips_bad_lines(tmp_path):
+    path = str(tmp_path / "shots.shots")
+    write(path, [1, 2, 3])
+    index_path = path + INDEX_SUFFIX
+    with open(index_path) as f:
+        lines = f.readlines()
+    with open(index_path, 'w') as f:
+        f.write(lines[0] + lines[1][:15] + "\n" + lines[2])
+    assert values(path) == [1, 3]
@@ -0,0 +1,34 @@
+import numpy as np
+
+from cam import ShotRingBuffer
+
+
+def frame(value):
+    return np.full((2, 3, 3), value, dtype=np.uint8)
+
+
+def test_stacked_is_a_view_until_the_ring_wraps():
+    ring = ShotRingBuffer(capacity=4)
+    for value in range(3):
+        ring.append(frame(value))
+    stacked = ring.stacked()
+    assert np.shares_memory(stacked, ring.frames)
+    assert [int(f[0, 0, 0]) for f in stacked] == [0, 1, 2]
+
+
+def test_stacked_after_wrap_keeps_earlier_views():
+    ring = ShotRingBuffer(capacity=4)
+    for value in range(6):
+        ring.append(frame(value))
+    views = ring.views()
+    single = ring[0]
+    before = [int(v[0, 0, 0]) for v in views]
+    assert before == [2, 3, 4, 5]
+
+    stacked = ring.stacked()
+    assert not np.shares_memory(stacked, ring.frames)
+    assert [int(f[0, 0, 0]) for f in stacked] == [2, 3, 4, 5]
+    # Storage was not reordered under the views handed out before
+    assert [int(v[0, 0, 0]) for v in views] == before
+    assert int(single[0, 0, 0]) == 2
+    assert ring.start == 2
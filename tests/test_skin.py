@@ -0,0 +1,46 @@
+import numpy as np
+
+from fp2_headswap import (get_clothing_pixels_batch, get_upper_body_region,
+                          filter_skin_pixels, is_skin_color, skin_mask)
+
+
+def reference_filter(region):
+    """The original per-pixel loop"""
+    pixels = region.reshape(-1, 3)
+    mask = np.array([not is_skin_color(pixel) for pixel in pixels], dtype=bool)
+    return pixels[mask]
+
+
+def color_grid():
+    """Every combination of coarse steps and the values around each rule's threshold"""
+    values = sorted(set(range(0, 256, 15)) | {19, 20, 21, 39, 40, 41, 94, 95, 96, 255})
+    b, g, r = np.meshgrid(values, values, values, indexing='ij')
+    return np.stack([b, g, r], axis=-1).reshape(-1, 3).astype(np.uint8)
+
+
+def test_skin_mask_matches_is_skin_color():
+    pixels = color_grid()
+    expected = np.array([is_skin_color(pixel) for pixel in pixels], dtype=bool)
+    np.testing.assert_array_equal(skin_mask(pixels), expected)
+    # Any leading shape works
+    np.testing.assert_array_equal(skin_mask(pixels.reshape(-1, 1, 3)).reshape(-1), expected)
+
+
+def test_filter_skin_pixels_matches_loop():
+    region = np.random.default_rng(0).integers(0, 256, (40, 50, 3), dtype=np.uint8)
+    np.testing.assert_array_equal(filter_skin_pixels(region), reference_filter(region))
+
+
+def test_clothing_batch_matches_per_face_on_overlapping_regions():
+    rng = np.random.default_rng(1)
+    frame = rng.integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    # Overlapping body regions, one clipped by the frame edge, one empty (face at the bottom)
+    faces = [(60, 40, 50, 50), (90, 50, 45, 45), (270, 60, 60, 60), (100, 235, 30, 30)]
+
+    results = get_clothing_pixels_batch(frame, faces)
+    assert len(results) == len(faces)
+    for face, (region, coords, filtered) in zip(faces, results):
+        expected_region, expected_coords = get_upper_body_region(frame, face)
+        assert coords == expected_coords
+        np.testing.assert_array_equal(region, expected_region)
+        np.testing.assert_array_equal(filtered, reference_filter(expected_region))
@@ -0,0 +1,30 @@
+import multiprocessing
+import os
+
+import numpy as np
+
+from cat import load_all_cats
+from conftest import SRC_DIR
+
+SPRITE_PATH = os.path.join(SRC_DIR, "cat.png")
+
+
+def _fill_cache(cache_dir):
+    return len(load_all_cats(SPRITE_PATH, cache_dir=cache_dir))
+
+
+def test_parallel_cache_fill(tmp_path):
+    cache_dir = str(tmp_path)
+    # Several workers miss the cache at once and all write it
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        assert pool.map(_fill_cache, [cache_dir] * 8) == [16] * 8
+
+    names = sorted(os.listdir(cache_dir))
+    assert len(names) == 2
+    assert not any(".tmp" in name for name in names)
+
+    cached = load_all_cats(SPRITE_PATH, cache_dir=cache_dir)
+    fresh = load_all_cats(SPRITE_PATH, cache_dir=None)
+    assert isinstance(cached[0], np.memmap)
+    for a, b in zip(cached, fresh):
+        np.testing.assert_array_equal(a, b)
@@ -0,0 +1,34 @@
+import pytest
+
+from face_detection import box_iou
+
+DETECT_KWARGS = {'scale_factor': 1.1, 'min_neighbors': 5, 'min_size': (30, 30)}
+
+# Tiled boxes come from merged seam duplicates, so they are close to but
+# not exactly the single-call boxes: every face must be found once, with
+# at least this IoU against its single-call box
+MIN_IOU = 0.6
+
+
+def match(expected, found):
+    """Greedy one-to-one IoU pairing, returns the IoU of every matched pair"""
+    pairs = sorted(((box_iou(a, b), i, j) for i, a in enumerate(expected)
+                    for j, b in enumerate(found)), reverse=True)
+    used_expected, used_found, ious = set(), set(), []
+    for iou, i, j in pairs:
+        if i in used_expected or j in used_found or iou < MIN_IOU:
+            continue
+        used_expected.add(i)
+        used_found.add(j)
+        ious.append(iou)
+    return ious
+
+
+@pytest.mark.parametrize("tiles", [(2, 2), (3, 3), (4, 2)])
+def test_tiled_matches_single_call(hollywoof, face_detector, tiles):
+    expected = face_detector.detect_faces(hollywoof, **DETECT_KWARGS)
+    found = face_detector.detect_faces(hollywoof, tiles=tiles, **DETECT_KWARGS)
+
+    assert len(expected) == 8
+    assert len(found) == len(expected)
+    assert len(match(expected, found)) == len(expected)
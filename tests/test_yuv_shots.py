@@ -0,0 +1,56 @@
+import builtins
+
+import cv2 as cv
+import numpy as np
+import pytest
+
+import benchmark
+import cam
+from cam import CameraController
+from fake_camera import FakePicamera2
+from conftest import SRC_DIR
+
+SIZE = (320, 240)
+
+
+@pytest.fixture
+def yuv_camera(monkeypatch, tmp_path):
+    """YUV420 camera on the still test image, shooting one frame per take_shot"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cam.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(builtins, "input", lambda prompt="": "s")
+    camera = CameraController(pixel_format="YUV420", size=SIZE,
+                              backend=lambda camid: FakePicamera2(camid, source=f"{SRC_DIR}/hollywoof.png"))
+    yield camera
+    camera.stop_preview()
+
+
+def expected_frame(hollywoof):
+    # First fake frame is not panned yet
+    return cv.resize(hollywoof, SIZE, interpolation=cv.INTER_AREA)
+
+
+def assert_close(frame, expected):
+    assert frame.shape == expected.shape
+    # Only the 4:2:0 chroma subsampling round trip is lost
+    assert np.mean(cv.absdiff(frame, expected)) < 4
+
+
+def test_yuv_shots_are_stored_as_rgb(yuv_camera, hollywoof):
+    yuv_camera.take_shot()
+    shot = yuv_camera.get_shot(0)
+    assert shot.shape == (SIZE[1], SIZE[0], 3)
+    assert_close(cv.cvtColor(shot, cv.COLOR_RGB2BGR), expected_frame(hollywoof))
+
+
+def test_yuv_shots_replay_through_benchmark_readers(yuv_camera, hollywoof, tmp_path):
+    yuv_camera.open_archive(str(tmp_path / "shots.shots"))
+    yuv_camera.take_shot()
+    yuv_camera.close_archive()
+    yuv_camera.save_shots_to_file(str(tmp_path / "shots.npz"))
+
+    for frames in (benchmark.frames_from_npz(str(tmp_path / "shots.npz")),
+                   benchmark.frames_from_archive(str(tmp_path / "shots.shots"))):
+        frames = list(frames)
+        assert len(frames) == 1
+        assert_close(frames[0], expected_frame(hollywoof))